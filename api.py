@@ -0,0 +1,172 @@
+"""JSON HTTP API for the calculation engine, without the Streamlit UI.
+
+An ASGI app (Starlette) for irrigation controllers and other programs:
+
+    uvicorn api:app --workers 4
+    python api.py                     # same, configured from ABONO_API_*
+
+Endpoints:
+
+    GET  /health      liveness check
+    POST /calculate   results for one event (a JSON object) or a batch
+                      (a JSON array, or {"eventos": [...]})
+    POST /report      PDF report for one event, or a farm report for a batch
+    POST /share       share text and email/WhatsApp/Telegram links for one
+                      event or a summary of a batch, without any PDF
+
+Events use the same fields as the form in app.py and the files read by
+cli.py. Batches are computed in one vectorized pass with calculate_batch().
+PDF rendering runs in a worker thread so it doesn't block other requests,
+and neither streamlit nor reportlab are imported until a PDF is requested.
+"""
+import math
+import os
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from batch import compute_chunk, iter_records
+from calculations import INPUT_FIELDS, calculate
+from metrics import timed
+from share import build_share_links, build_share_package, generate_batch_share_text
+
+MAX_EVENTOS = int(os.environ.get('ABONO_API_MAX_EVENTOS', 100_000))
+
+class InvalidRequest(ValueError):
+    """Request body that can't be turned into irrigation events"""
+
+def _parse_event(evento):
+    """Validate one event object, returning (numero_invernadero, inputs)"""
+    if not isinstance(evento, dict):
+        raise InvalidRequest("Cada riego debe ser un objeto JSON")
+    faltan = [campo for campo in INPUT_FIELDS if campo not in evento]
+    if faltan:
+        raise InvalidRequest(f"Faltan campos: {', '.join(faltan)}")
+    valores = []
+    for campo in INPUT_FIELDS:
+        valor = evento[campo]
+        # bool is an int subclass, but true/false are not valid measurements
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+            raise InvalidRequest(f"El campo {campo} debe ser un número")
+        valores.append(valor)
+    numero = evento.get('numero_invernadero', '')
+    return ('' if numero is None else str(numero)), valores
+
+def _parse_events(body):
+    """Turn a request body into a single event dict or a chunk of events.
+
+    Returns (single, data): for a JSON object, data is the computed event
+    record; for a batch, it's a chunk of columns ready for compute_chunk().
+    """
+    if isinstance(body, dict) and 'eventos' not in body:
+        numero, valores = _parse_event(body)
+        return True, {'numero_invernadero': numero, **dict(zip(INPUT_FIELDS, valores)), **calculate(*valores)}
+
+    eventos = body.get('eventos') if isinstance(body, dict) else body
+    if not isinstance(eventos, list):
+        raise InvalidRequest("Se esperaba un riego o una lista de riegos")
+    if len(eventos) > MAX_EVENTOS:
+        raise InvalidRequest(f"Como máximo {MAX_EVENTOS} riegos por petición")
+
+    parsed = [_parse_event(evento) for evento in eventos]
+    chunk = {'numero_invernadero': [numero for numero, _ in parsed]}
+    columnas = np.array([valores for _, valores in parsed], dtype=np.float64).reshape(-1, len(INPUT_FIELDS))
+    for i, campo in enumerate(INPUT_FIELDS):
+        chunk[campo] = columnas[:, i]
+    return False, chunk
+
+async def _read_events(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise InvalidRequest("El cuerpo de la petición no es JSON válido")
+    return _parse_events(body)
+
+def _error(mensaje, status_code=422):
+    return JSONResponse({'error': mensaje}, status_code=status_code)
+
+def _clean(record):
+    # Infinite or NaN values aren't valid JSON
+    return {k: None if isinstance(v, float) and not math.isfinite(v) else v for k, v in record.items()}
+
+async def health(request):
+    return JSONResponse({'status': 'ok'})
+
+async def calculate_endpoint(request):
+    try:
+        single, data = await _read_events(request)
+    except InvalidRequest as e:
+        return _error(str(e))
+
+    if single:
+        return JSONResponse(_clean(data))
+    with timed('api_calculate'):
+        resultados = [_clean(record) for record in iter_records([compute_chunk(data)])]
+    return JSONResponse({'total': len(resultados), 'resultados': resultados})
+
+def _render_report(single, data):
+    if single:
+        from pdf_cache import cached_pdf_report
+        return cached_pdf_report(data)
+
+    from report import generate_farm_report
+    return generate_farm_report(iter_records([compute_chunk(data)]))
+
+async def report_endpoint(request):
+    try:
+        single, data = await _read_events(request)
+    except InvalidRequest as e:
+        return _error(str(e))
+    if not single and not len(data['numero_invernadero']):
+        return _error("La lista de riegos está vacía")
+
+    with timed('api_report'):
+        pdf_bytes = await run_in_threadpool(_render_report, single, data)
+
+    if single:
+        # The id comes from the client, so keep it out of the header syntax
+        numero = ''.join(c for c in data['numero_invernadero'] if c.isalnum() or c in '-_')
+        nombre = f"informe_abono_{numero or 'sin_numero'}.pdf"
+    else:
+        nombre = "informe_explotacion.pdf"
+    return Response(
+        pdf_bytes,
+        media_type='application/pdf',
+        headers={'Content-Disposition': f'attachment; filename="{nombre}"'}
+    )
+
+async def share_endpoint(request):
+    try:
+        single, data = await _read_events(request)
+    except InvalidRequest as e:
+        return _error(str(e))
+
+    with timed('api_share'):
+        if single:
+            paquete = build_share_package(data)
+            texto, links = paquete['text'], paquete['links']
+        else:
+            texto = generate_batch_share_text([compute_chunk(data)])
+            links = build_share_links(texto)
+    return JSONResponse({'text': texto, 'links': links})
+
+app = Starlette(routes=[
+    Route('/health', health, methods=['GET']),
+    Route('/calculate', calculate_endpoint, methods=['POST']),
+    Route('/report', report_endpoint, methods=['POST']),
+    Route('/share', share_endpoint, methods=['POST'])
+])
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        'api:app',
+        host=os.environ.get('ABONO_API_HOST', '127.0.0.1'),
+        port=int(os.environ.get('ABONO_API_PORT', 8000)),
+        workers=int(os.environ.get('ABONO_API_WORKERS', 1)),
+        timeout_keep_alive=int(os.environ.get('ABONO_API_KEEP_ALIVE', 30))
+    )
@@ -1,354 +1,616 @@
 import streamlit as st
-import numpy as np
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-import io
-import base64
-from datetime import datetime
-
-def generate_pdf_report(data):
-    """Generate PDF report with calculation results"""
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=1*inch)
-    
-    # Get styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=30,
-        alignment=1  # Center alignment
-    )
-    
-    story = []
-    
-    # Title
-    story.append(Paragraph("Calculadora de Abono para Invernaderos", title_style))
-    story.append(Spacer(1, 20))
-    
-    # Date
-    fecha = datetime.now().strftime("%d/%m/%Y %H:%M")
-    story.append(Paragraph(f"<b>Fecha del cálculo:</b> {fecha}", styles['Normal']))
-    story.append(Spacer(1, 20))
-    
-    # Input data table
-    input_data = [
-        ['Parámetro', 'Valor'],
-        ['Número de invernadero', data.get('numero_invernadero', 'No especificado')],
-        ['Superficie del invernadero', f"{data['superficie']:.2f} m²"],
-        ['Goteros totales', str(data['goteros_totales'])],
-        ['Caudal de cada gotero', f"{data['caudal_gotero']:.2f} L×H⁻¹"],
-        ['CE del abono', str(data['ce_abono'])],
-        ['Tiempo de riego', f"{data['tiempo_riego']:.1f} minutos"]
-    ]
-    
-    input_table = Table(input_data, colWidths=[3*inch, 2*inch])
-    input_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    story.append(Paragraph("<b>Datos de Entrada:</b>", styles['Heading2']))
-    story.append(input_table)
-    story.append(Spacer(1, 20))
-    
-    # Results table
-    results_data = [
-        ['Resultado', 'Valor'],
-        ['Goteros por metro cuadrado', f"{data['goteros_por_metro']:.4f}"],
-        ['Litros de agua por hora', f"{data['litros_agua_hora']:.2f} L"],
-        ['Caudal cada 1000 m² por hora', f"{data['caudal_1000m2_hora']:.2f} L"],
-        ['Cantidad de agua gastada en este riego', f"{data.get('agua_gastada_riego', 0):.2f} L"],
-        ['Abono gastado en el riego', f"{data['abono_gastado']:.2f} Kg"]
-    ]
+import math
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from calculations import EVENT_FIELDS, INPUT_FIELDS, calculate_cached
+from history import DEFAULT_PAGE_SIZE, get_history_store
+from registry import get_registry
+import metrics
+from pdf_cache import cached_pdf_report
+from records import Calculation
+from share import build_share_package, build_share_links, submit_share_pdf
+from theme import inject_css, metric_card_html
+
+# Streamlit keeps both the uploaded file and the results to download in
+# memory, so bigger files are left to cli.py
+BULK_MAX_BYTES = int(os.environ.get('ABONO_BULK_MAX_MB', '20')) * 1024 * 1024
+
+FOOTER_HTML = """
+    <div class="info-section" style="margin-top: 2rem;">
+        <h4 style="color: #1976D2; margin-top: 0;">ℹ️ Instrucciones de uso</h4>
+        <ol style="margin: 1rem 0;">
+            <li>Introduce todos los datos de entrada en los campos de la izquierda</li>
+            <li>Los cálculos se actualizarán automáticamente</li>
+            <li>El resultado final del abono gastado aparecerá cuando todos los campos estén completos</li>
+            <li>Usa los botones para guardar en el historial, guardar en PDF, compartir o reiniciar</li>
+        </ol>
+    </div>
+    """
+
+def metric_card(titulo, valor, formula):
+    """Render a result card"""
+    with timed('tarjeta'):
+        st.markdown(metric_card_html(titulo, valor, formula), unsafe_allow_html=True)
+
+def timed(stage):
+    """Time a stage for the process metrics and this session's timing panel"""
+    if not metrics.ENABLED:
+        return metrics.timed(stage)
+    return metrics.timed(stage, st.session_state.setdefault('_tiempos', {}))
+
+def is_admin():
+    """Admin views are shown with ?admin=<ABONO_ADMIN_TOKEN> in the URL"""
+    token = os.environ.get('ABONO_ADMIN_TOKEN')
+    return bool(token) and st.query_params.get('admin') == token
+
+def admin_panel():
+    """Per-session and process-wide stage timings, for administrators"""
+    with st.expander("⏱️ Tiempos (administración)"):
+        if not metrics.ENABLED:
+            st.info("Las métricas están desactivadas. Arranca la aplicación con ABONO_METRICS=1 para activarlas.")
+            return
+        sesion = st.session_state.get('_tiempos', {})
+        st.markdown("**Esta sesión**")
+        st.dataframe(
+            [
+                {'etapa': etapa, 'veces': veces, 'total_ms': total * 1000, 'media_ms': total / veces * 1000, 'max_ms': maximo * 1000}
+                for etapa, (veces, total, maximo) in sorted(sesion.items())
+            ],
+            hide_index=True
+        )
+        st.markdown("**Servidor**")
+        st.dataframe(
+            [
+                {'etapa': etapa, 'veces': datos['count'], 'media_ms': datos['total_seconds'] / datos['count'] * 1000, 'max_ms': datos['max_seconds'] * 1000}
+                for etapa, datos in sorted(metrics.snapshot().items())
+            ],
+            hide_index=True
+        )
+
+def record_calculation(calculo):
+    """Save a calculation in the history as one irrigation.
+
+    Called only from the "Guardar en historial" button, once per press:
+    the values typed or stepped through on the way are not recorded, and
+    saving the same values again records another irrigation, as happens
+    with several identical irrigations in a day. Returns whether it was
+    saved.
+    """
+    try:
+        get_history_store().record(calculo)
+        return True
+    except Exception as e:
+        st.warning(f"No se pudo guardar el cálculo en el historial: {str(e)}")
+        return False
+
+@st.fragment(run_every=0.5)
+def _share_progress():
+    """Poll the background PDF render until it finishes"""
+    if st.session_state['share_pdf_job'].done():
+        # Rerun the page once so the download replaces this poller
+        st.rerun(scope="app")
+    st.info("⏳ Preparando el PDF para adjuntar...")
+
+def share_links(links):
+    """Email, WhatsApp and Telegram buttons for share links"""
+    col_email, col_whatsapp, col_telegram = st.columns(3)
+    email_link = links['email']
+    whatsapp_link = links['whatsapp']
+    telegram_link = links['telegram']
     
-    results_table = Table(results_data, colWidths=[3*inch, 2*inch])
-    results_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.darkgreen),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.lightgreen),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),  # Bold last row
-        ('FONTSIZE', (0, -1), (-1, -1), 11)
-    ]))
+    with col_email:
+        st.markdown(f'<a href="{email_link}" target="_blank"><button style="background: #4CAF50; color: white; border: none; padding: 10px 15px; border-radius: 5px; cursor: pointer; width: 100%;">📧 Email</button></a>', unsafe_allow_html=True)
     
-    story.append(Paragraph("<b>Resultados:</b>", styles['Heading2']))
-    story.append(results_table)
+    with col_whatsapp:
+        st.markdown(f'<a href="{whatsapp_link}" target="_blank"><button style="background: #25D366; color: white; border: none; padding: 10px 15px; border-radius: 5px; cursor: pointer; width: 100%;">📱 WhatsApp</button></a>', unsafe_allow_html=True)
     
-    doc.build(story)
-    buffer.seek(0)
-    return buffer.getvalue()
+    with col_telegram:
+        st.markdown(f'<a href="{telegram_link}" target="_blank"><button style="background: #0088cc; color: white; border: none; padding: 10px 15px; border-radius: 5px; cursor: pointer; width: 100%;">✈️ Telegram</button></a>', unsafe_allow_html=True)
 
-def generate_share_text(data):
-    """Generate comprehensive text with all data and results for sharing"""
-    fecha = datetime.now().strftime("%d/%m/%Y %H:%M")
-    
-    share_text = f"""🌱 CALCULADORA DE ABONO PARA INVERNADEROS
-Fecha del cálculo: {fecha}
-
-📊 DATOS DE ENTRADA:
-• Número de invernadero: {data.get('numero_invernadero', 'No especificado')}
-• Superficie del invernadero: {data['superficie']:.2f} m²
-• Goteros totales: {data['goteros_totales']}
-• Caudal de cada gotero: {data['caudal_gotero']:.2f} L×H⁻¹
-• CE del abono: {data['ce_abono']}
-• Tiempo de riego: {data['tiempo_riego']:.1f} minutos
-
-📈 RESULTADOS CALCULADOS:
-• Goteros por metro cuadrado: {data['goteros_por_metro']:.4f}
-• Litros de agua por hora: {data['litros_agua_hora']:.2f} L
-• Caudal cada 1000 m² por hora: {data['caudal_1000m2_hora']:.2f} L
-• Cantidad de agua gastada en este riego: {data.get('agua_gastada_riego', 0):.2f} L
-
-🎯 RESULTADO FINAL:
-• Abono gastado en el riego: {data['abono_gastado']:.2f} Kg
-
-Calculado con: https://calculadora-abono-invernaderos.replit.app"""
-    
-    return share_text
+def share_panel():
+    """Share links of the calculation shared with the Compartir button, and its PDF on request"""
+    share_data, paquete = st.session_state['share_job']
+    
+    st.markdown("### 📤 Compartir Resultados")
+    share_links(paquete['links'])
+    
+    # The PDF is only rendered if asked for, in the background
+    job = st.session_state.get('share_pdf_job')
+    if job is None:
+        if st.button("📄 Adjuntar PDF", key="share_pdf"):
+            st.session_state['share_pdf_job'] = job = submit_share_pdf(share_data)
+        else:
+            return
+    if not job.done():
+        _share_progress()
+        return
+    
+    try:
+        pdf_bytes = job.result()
+    except Exception as e:
+        st.error(f"Error generando PDF para compartir: {str(e)}")
+        return
+    
+    numero_invernadero = share_data['numero_invernadero']
+    fecha_archivo = datetime.now().strftime("%Y%m%d_%H%M")
+    nombre_archivo = f"calculo_abono_{numero_invernadero}_{fecha_archivo}.pdf" if numero_invernadero else f"calculo_abono_{fecha_archivo}.pdf"
+    st.download_button(
+        label="📄 Descargar PDF para compartir",
+        data=pdf_bytes,
+        file_name=nombre_archivo,
+        mime="application/pdf",
+        key="share_download"
+    )
+    st.info("💡 Descarga el PDF y adjúntalo al mensaje si quieres enviar el informe completo")
+
+@st.fragment
+def history_section():
+    """Browse saved calculations and per-greenhouse totals"""
+    with st.expander("🗂️ Historial de cálculos"):
+        # Tables pull in pandas and pyarrow, so they are only built on demand
+        if not st.toggle("Mostrar historial", key="historial_visible"):
+            return
+        
+        col_filtro1, col_filtro2, col_filtro3 = st.columns(3)
+        with col_filtro1:
+            invernadero = st.text_input("Invernadero:", value="", key="historial_invernadero")
+        with col_filtro2:
+            desde = st.date_input("Desde:", value=None, key="historial_desde")
+        with col_filtro3:
+            hasta = st.date_input("Hasta:", value=None, key="historial_hasta")
+        
+        filtros = (invernadero or None, desde, hasta)
+        # Cursors of the pages visited so far, reset whenever the filters change
+        if st.session_state.get('historial_filtros') != filtros:
+            st.session_state['historial_filtros'] = filtros
+            st.session_state['historial_paginas'] = [None]
+        paginas = st.session_state['historial_paginas']
+        
+        try:
+            store = get_history_store()
+            filas, siguiente = store.query(*filtros, limit=DEFAULT_PAGE_SIZE, cursor=paginas[-1])
+            totales = store.aggregate(desde, hasta, invernadero or None)
+        except Exception as e:
+            st.error(f"Error leyendo el historial: {str(e)}")
+            return
+        
+        st.markdown("**Totales por invernadero**")
+        st.dataframe(totales, hide_index=True)
+        
+        st.markdown(f"**Cálculos** (página {len(paginas)})")
+        st.dataframe(filas, hide_index=True)
+        
+        col_anterior, col_siguiente = st.columns(2)
+        with col_anterior:
+            if st.button("⬅️ Anterior", disabled=len(paginas) == 1, key="historial_anterior"):
+                paginas.pop()
+                st.rerun(scope="fragment")
+        with col_siguiente:
+            if st.button("Siguiente ➡️", disabled=siguiente is None, key="historial_siguiente"):
+                paginas.append(siguiente)
+                st.rerun(scope="fragment")
+
+@st.fragment
+def dashboard_section():
+    """Water and fertilizer per greenhouse and day or week, from the history rollups"""
+    with st.expander("📊 Panel de consumo"):
+        # Charts and tables pull in pandas, so they are only built on demand
+        if not st.toggle("Mostrar panel", key="panel_visible"):
+            return
+        
+        col_periodo, col_desde, col_hasta, col_invernadero = st.columns(4)
+        with col_periodo:
+            periodo = st.radio("Agrupar por:", ['dia', 'semana'], format_func={'dia': 'Día', 'semana': 'Semana'}.get, horizontal=True, key="panel_periodo")
+        with col_desde:
+            desde = st.date_input("Desde:", value=datetime.now().date() - timedelta(days=30), key="panel_desde")
+        with col_hasta:
+            hasta = st.date_input("Hasta:", value=None, key="panel_hasta")
+        with col_invernadero:
+            invernadero = st.text_input("Invernadero:", value="", key="panel_invernadero")
+        
+        try:
+            with timed('panel'):
+                filas = get_history_store().totals(periodo, desde, hasta, invernadero or None)
+        except Exception as e:
+            st.error(f"Error leyendo el historial: {str(e)}")
+            return
+        if not filas:
+            st.info("No hay cálculos guardados en este periodo")
+            return
+        
+        # Farm totals per period for the charts; rows come ordered by period
+        explotacion = {}
+        for fila in filas:
+            totales = explotacion.setdefault(fila[periodo], [0.0, 0.0])
+            totales[0] += fila['agua_gastada_riego']
+            totales[1] += fila['abono_gastado']
+        
+        col_agua, col_abono = st.columns(2)
+        with col_agua:
+            metric_card("🌊 Agua en el periodo", f"{sum(t[0] for t in explotacion.values()):.2f} L", f"{len(explotacion)} {'días' if periodo == 'dia' else 'semanas'}")
+            st.bar_chart({'periodo': list(explotacion), 'Agua (L)': [t[0] for t in explotacion.values()]}, x='periodo')
+        with col_abono:
+            metric_card("🎯 Abono en el periodo", f"{sum(t[1] for t in explotacion.values()):.2f} Kg", f"{sum(f['riegos'] for f in filas)} riegos")
+            st.bar_chart({'periodo': list(explotacion), 'Abono (Kg)': [t[1] for t in explotacion.values()]}, x='periodo')
+        
+        st.dataframe(filas, hide_index=True)
+
+def _solver_missing_message(entradas, resultado):
+    """Why the solver has no answer: the inputs of entradas (label: value) that are still 0"""
+    faltan = [etiqueta for etiqueta, valor in entradas.items() if not valor > 0]
+    return f"Introduce {' y '.join(faltan)} para calcular {resultado}"
+
+@st.fragment
+def solver_section():
+    """Irrigation time or CE needed to reach a target, for the current greenhouse"""
+    with st.expander("🎯 Calcular tiempo de riego o CE para un objetivo"):
+        superficie = st.session_state.get('superficie', 0.0)
+        goteros_totales = st.session_state.get('goteros_totales', 0)
+        caudal_gotero = st.session_state.get('caudal_gotero', 0.0)
+        if not (superficie > 0 and goteros_totales > 0 and caudal_gotero > 0):
+            st.info("Introduce la superficie, los goteros y el caudal del invernadero para usar el cálculo inverso")
+            return
+        
+        from solver import required_ce_for_fertilizer, required_time_for_fertilizer, required_time_for_water
+        
+        objetivo = st.radio(
+            "Quiero conocer:",
+            ["Tiempo de riego para un abono", "Tiempo de riego para un volumen de agua", "CE del abono para un abono"],
+            key="solver_objetivo"
+        )
+        
+        if objetivo == "Tiempo de riego para un volumen de agua":
+            agua_objetivo = st.number_input("Agua a aportar (L):", min_value=0.0, value=0.0, step=100.0, format="%.2f", key="solver_agua")
+            tiempo = float(required_time_for_water(superficie, goteros_totales, caudal_gotero, agua_objetivo))
+            if math.isnan(tiempo):
+                st.info("Introduce el agua a aportar para calcular el tiempo de riego")
+            else:
+                metric_card("⏱️ Tiempo de riego necesario", f"{tiempo:.1f} minutos", "Agua × 60 / Litros de agua por hora")
+            return
+        
+        abono_objetivo = st.number_input("Abono a aportar (Kg):", min_value=0.0, value=0.0, step=0.1, format="%.2f", key="solver_abono")
+        if objetivo == "Tiempo de riego para un abono":
+            ce_abono = st.number_input("CE del abono:", min_value=0.0, value=st.session_state.get('ce_abono', 0.0), step=0.1, format="%.2f", key="solver_ce")
+            tiempo = float(required_time_for_fertilizer(superficie, goteros_totales, caudal_gotero, ce_abono, abono_objetivo))
+            if math.isnan(tiempo):
+                st.info(_solver_missing_message({'el abono a aportar': abono_objetivo, 'la CE del abono': ce_abono}, "el tiempo de riego"))
+            else:
+                metric_card("⏱️ Tiempo de riego necesario", f"{tiempo:.1f} minutos", "Abono / ((Caudal cada 1000 m² / 100000) × CE × (Superficie / 1000))")
+        else:
+            tiempo_riego = st.number_input("Tiempo de riego (minutos):", min_value=0.0, value=st.session_state.get('tiempo_riego', 0.0), step=1.0, format="%.1f", key="solver_tiempo")
+            ce = float(required_ce_for_fertilizer(superficie, goteros_totales, caudal_gotero, tiempo_riego, abono_objetivo))
+            if math.isnan(ce):
+                st.info(_solver_missing_message({'el abono a aportar': abono_objetivo, 'el tiempo de riego': tiempo_riego}, "la CE del abono"))
+            else:
+                metric_card("⚡ CE del abono necesaria", f"{ce:.2f}", "Abono / ((Caudal cada 1000 m² / 100000) × Tiempo × (Superficie / 1000))")
+
+# Labels of the input fields, for selectors outside the main form
+ETIQUETAS_CAMPOS = {
+    'superficie': 'Superficie del invernadero (m²)',
+    'goteros_totales': 'Goteros totales',
+    'caudal_gotero': 'Caudal de cada gotero (L×H⁻¹)',
+    'ce_abono': 'CE del abono',
+    'tiempo_riego': 'Tiempo de riego (minutos)',
+}
+
+@st.fragment
+def sweep_section():
+    """Heatmap of water or fertilizer over a grid of two inputs"""
+    with st.expander("🔬 Análisis de sensibilidad"):
+        # The grid and chart pull in NumPy and Altair, and while shown every
+        # form input reruns the page, so it is only built on demand
+        if not st.toggle("Mostrar análisis", key="sensibilidad_visible"):
+            return
+        
+        base = {campo: float(st.session_state.get(campo, 0) or 0) for campo in ETIQUETAS_CAMPOS}
+        if not (base['superficie'] > 0 and base['goteros_totales'] > 0 and base['caudal_gotero'] > 0):
+            st.info("Introduce la superficie, los goteros y el caudal del invernadero para ver el análisis")
+            return
+        
+        from sweep import sweep_grid
+        
+        campos = list(ETIQUETAS_CAMPOS)
+        
+        col_x, col_y = st.columns(2)
+        rangos = {}
+        for columna, eje, defecto in ((col_x, 'x', 'caudal_gotero'), (col_y, 'y', 'tiempo_riego')):
+            with columna:
+                campo = st.selectbox(
+                    f"Parámetro del eje {eje.upper()}:",
+                    campos,
+                    index=campos.index(defecto),
+                    format_func=ETIQUETAS_CAMPOS.get,
+                    key=f"sweep_campo_{eje}"
+                )
+                actual = base[campo] or 1.0
+                inicio, fin = st.slider(
+                    "Rango:",
+                    min_value=0.0,
+                    max_value=round(actual * 3, 2),
+                    value=(round(actual * 0.5, 2), round(actual * 1.5, 2)),
+                    key=f"sweep_rango_{eje}_{campo}"
+                )
+                rangos[eje] = (campo, (inicio, fin, 50))
+        
+        resultado = st.radio(
+            "Resultado:",
+            ['abono_gastado', 'agua_gastada_riego'],
+            format_func={'abono_gastado': 'Abono gastado (Kg)', 'agua_gastada_riego': 'Agua gastada (L)'}.get,
+            horizontal=True,
+            key="sweep_resultado"
+        )
+        
+        try:
+            with timed('sensibilidad'):
+                grid = sweep_grid(tuple(base.items()), *rangos['x'], *rangos['y'])
+        except Exception as e:
+            st.error(f"Error en el análisis: {str(e)}")
+            return
+        
+        import altair as alt
+        
+        valores = grid[resultado]
+        # Each cell spans from its grid point to the next one
+        paso_x = grid['x'][1] - grid['x'][0]
+        paso_y = grid['y'][1] - grid['y'][0]
+        datos = [
+            {'x': float(x), 'x2': float(x + paso_x), 'y': float(y), 'y2': float(y + paso_y), 'valor': float(valores[j, i])}
+            for j, y in enumerate(grid['y'])
+            for i, x in enumerate(grid['x'])
+        ]
+        grafico = alt.Chart(alt.Data(values=datos)).mark_rect().encode(
+            x=alt.X('x:Q', title=ETIQUETAS_CAMPOS[rangos['x'][0]]),
+            x2='x2:Q',
+            y=alt.Y('y:Q', title=ETIQUETAS_CAMPOS[rangos['y'][0]]),
+            y2='y2:Q',
+            color=alt.Color('valor:Q', title=None, scale=alt.Scale(scheme='greens')),
+            tooltip=['x:Q', 'y:Q', 'valor:Q']
+        ).interactive()
+        st.altair_chart(grafico)
+
+# Default crop phases for the season simulator
+FASES_CAMPANA = [
+    {'fase': 'Trasplante', 'dias': 30, 'riegos_por_dia': 2, 'tiempo_riego': 15.0, 'ce_abono': 1.2},
+    {'fase': 'Crecimiento', 'dias': 90, 'riegos_por_dia': 4, 'tiempo_riego': 25.0, 'ce_abono': 1.8},
+    {'fase': 'Producción', 'dias': 80, 'riegos_por_dia': 3, 'tiempo_riego': 20.0, 'ce_abono': 1.5},
+]
+
+@st.fragment
+def season_section():
+    """Cumulative water and fertilizer of a season plan for the current greenhouse"""
+    with st.expander("📅 Simulación de campaña"):
+        superficie = st.session_state.get('superficie', 0.0)
+        goteros_totales = st.session_state.get('goteros_totales', 0)
+        caudal_gotero = st.session_state.get('caudal_gotero', 0.0)
+        if not (superficie > 0 and goteros_totales > 0 and caudal_gotero > 0):
+            st.info("Introduce la superficie, los goteros y el caudal del invernadero para simular la campaña")
+            return
+        
+        from simulation import build_schedule, simulate_season
+        
+        st.markdown("Fases del cultivo (días, riegos por día, minutos por riego y CE):")
+        fases = st.data_editor(FASES_CAMPANA, num_rows="dynamic", hide_index=True, key="fases_campana")
+        
+        try:
+            plan = build_schedule([
+                (f.get('dias') or 0, f.get('riegos_por_dia') or 0, f.get('tiempo_riego') or 0, f.get('ce_abono') or 0)
+                for f in fases
+            ])
+            with timed('simulacion'):
+                simulacion = simulate_season(superficie, goteros_totales, caudal_gotero, **plan)
+        except Exception as e:
+            st.error(f"Error en la simulación: {str(e)}")
+            return
+        
+        if not len(plan['riegos_por_dia']):
+            return
+        agua_total = simulacion['agua_total_acumulada'][-1]
+        abono_total = simulacion['abono_total_acumulado'][-1]
+        
+        col_agua, col_abono = st.columns(2)
+        with col_agua:
+            metric_card("🌊 Agua en la campaña", f"{agua_total:.2f} L", f"{len(plan['riegos_por_dia'])} días")
+            st.line_chart({'Agua acumulada (L)': simulacion['agua_total_acumulada']})
+        with col_abono:
+            metric_card("🎯 Abono en la campaña", f"{abono_total:.2f} Kg", f"{int(plan['riegos_por_dia'].sum())} riegos")
+            st.line_chart({'Abono acumulado (Kg)': simulacion['abono_total_acumulado']})
+
+@st.fragment
+def bulk_import_section():
+    """Bulk calculation of irrigation events imported from a CSV or Parquet file"""
+    with st.expander("📂 Importación masiva de riegos (CSV / Parquet)"):
+        st.markdown(
+            f"El archivo debe incluir las columnas: <code>{', '.join(EVENT_FIELDS)}</code>",
+            unsafe_allow_html=True
+        )
+        archivo = st.file_uploader(
+            "Archivo de riegos:",
+            type=["csv", "parquet"],
+            help="Un riego por fila, con los mismos datos que el formulario",
+            key="archivo_riegos"
+        )
+        
+        if archivo is not None and archivo.size > BULK_MAX_BYTES:
+            st.warning(
+                f"El archivo ocupa {archivo.size / 1024 / 1024:.1f} MB y el máximo en la calculadora es "
+                f"{BULK_MAX_BYTES / 1024 / 1024:.0f} MB. Para archivos grandes usa la línea de órdenes: "
+                "python cli.py riegos.csv -o resultados.csv"
+            )
+        elif archivo is not None and st.button("⚙️ Calcular archivo", type="primary"):
+            from batch import compute_chunks, read_event_chunks, write_csv_chunks
+            from share import BatchShareSummary
+            
+            try:
+                # The upload and the CSV to download are both held in memory by
+                # Streamlit (hence BULK_MAX_BYTES); the results go through a
+                # temporary file only because the download takes a binary file
+                with tempfile.TemporaryDirectory() as carpeta:
+                    ruta = os.path.join(carpeta, 'resultados.csv')
+                    resumen = BatchShareSummary()
+                    with open(ruta, 'w', encoding='utf-8', newline='') as texto:
+                        total = write_csv_chunks(resumen.observe(compute_chunks(read_event_chunks(archivo, archivo.name))), texto)
+                    
+                    fecha_archivo = datetime.now().strftime("%Y%m%d_%H%M")
+                    st.success(f"✅ {total} riegos calculados")
+                    with open(ruta, 'rb') as resultado:
+                        st.download_button(
+                            label="⬇️ Descargar resultados CSV",
+                            data=resultado,
+                            file_name=f"calculo_abono_lote_{fecha_archivo}.csv",
+                            mime="text/csv",
+                            key="bulk_download"
+                        )
+                st.markdown("**Compartir el resumen:**")
+                share_links(build_share_links(resumen.text()))
+            except Exception as e:
+                st.error(f"Error procesando el archivo: {str(e)}")
 
 def main():
     # Modern CSS styling with contemporary design
-    st.markdown("""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-    
-    .stApp {
-        background: linear-gradient(135deg, #4ade80 0%, #22c55e 50%, #16a34a 100%);
-        background-attachment: fixed;
-        font-family: 'Inter', sans-serif;
-    }
-    
-    .main-container {
-        background: rgba(255, 255, 255, 0.95);
-        backdrop-filter: blur(20px);
-        border-radius: 24px;
-        padding: 2rem;
-        margin: 1rem;
-        box-shadow: 0 25px 50px -12px rgba(0, 0, 0, 0.25);
-        border: 1px solid rgba(255, 255, 255, 0.2);
-    }
-    
-    .main-header {
-        background: linear-gradient(135deg, #16a34a, #15803d);
-        padding: 3rem 2rem;
-        border-radius: 20px;
-        margin-bottom: 2rem;
-        text-align: center;
-        color: white;
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .main-header::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        bottom: 0;
-        background: linear-gradient(45deg, rgba(255,255,255,0.1), transparent);
-        pointer-events: none;
-    }
-    
-    .main-header h1 {
-        margin: 0;
-        font-size: 3rem;
-        font-weight: 600;
-        letter-spacing: -0.02em;
-        position: relative;
-        z-index: 1;
-    }
-    
-    .main-header p {
-        margin: 1rem 0 0 0;
-        font-size: 1.2rem;
-        opacity: 0.9;
-        font-weight: 400;
-        position: relative;
-        z-index: 1;
-    }
-    
-    .section-card {
-        background: rgba(255, 255, 255, 0.8);
-        backdrop-filter: blur(10px);
-        padding: 2rem;
-        border-radius: 16px;
-        margin-bottom: 1.5rem;
-        border: 1px solid rgba(255, 255, 255, 0.3);
-        box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1);
-    }
-    
-    .section-title {
-        font-size: 1.3rem;
-        font-weight: 600;
-        color: #1a202c;
-        margin-bottom: 1.5rem;
-        display: flex;
-        align-items: center;
-        gap: 0.5rem;
-    }
-    
-    .metric-card {
-        background: linear-gradient(135deg, #ffffff, #f8fafc);
-        padding: 1.5rem;
-        border-radius: 12px;
-        box-shadow: 0 4px 16px rgba(0, 0, 0, 0.08);
-        margin: 1rem 0;
-        border: 1px solid rgba(34, 197, 94, 0.1);
-        transition: all 0.3s ease;
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .metric-card::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        width: 4px;
-        height: 100%;
-        background: linear-gradient(135deg, #22c55e, #16a34a);
-    }
+    with timed('css'):
+        inject_css()
     
-    .metric-card:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 8px 25px rgba(0, 0, 0, 0.15);
-    }
-    
-    .final-result {
-        background: linear-gradient(135deg, #22c55e, #16a34a);
-        color: white;
-        padding: 2rem;
-        border-radius: 16px;
-        text-align: center;
-        font-size: 1.3rem;
-        font-weight: 600;
-        box-shadow: 0 10px 30px rgba(34, 197, 94, 0.4);
-        margin: 1.5rem 0;
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .final-result::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: -100%;
-        width: 100%;
-        height: 100%;
-        background: linear-gradient(90deg, transparent, rgba(255,255,255,0.2), transparent);
-        animation: shimmer 3s infinite;
-    }
-    
-    @keyframes shimmer {
-        0% { left: -100%; }
-        100% { left: 100%; }
-    }
-    
-    .stButton > button {
-        background: linear-gradient(135deg, #22c55e, #16a34a) !important;
-        color: white !important;
-        border: none !important;
-        border-radius: 12px !important;
-        padding: 0.75rem 1.5rem !important;
-        font-weight: 500 !important;
-        font-size: 0.95rem !important;
-        transition: all 0.3s ease !important;
-        box-shadow: 0 4px 15px rgba(34, 197, 94, 0.3) !important;
-        width: 100% !important;
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-2px) !important;
-        box-shadow: 0 8px 25px rgba(34, 197, 94, 0.4) !important;
-    }
-    
-    .stButton > button[kind="secondary"] {
-        background: linear-gradient(135deg, #64748b, #475569) !important;
-        box-shadow: 0 4px 15px rgba(100, 116, 139, 0.3) !important;
-    }
-    
-    .stButton > button[kind="secondary"]:hover {
-        box-shadow: 0 8px 25px rgba(100, 116, 139, 0.4) !important;
-    }
-    
-    .stNumberInput > div > div > input,
-    .stTextInput > div > div > input {
-        border-radius: 8px !important;
-        border: 2px solid #e2e8f0 !important;
-        transition: all 0.3s ease !important;
-        font-family: 'Inter', sans-serif !important;
-    }
+    # Modern header with glassmorphism effect
+    st.markdown("""
+    <div class="main-header">
+        <h1>🌱 Calculadora de Abono</h1>
+        <p>Calcula el gasto de abono en riegos de invernaderos</p>
+    </div>
+    """, unsafe_allow_html=True)
     
-    .stNumberInput > div > div > input:focus,
-    .stTextInput > div > div > input:focus {
-        border-color: #22c55e !important;
-        box-shadow: 0 0 0 3px rgba(34, 197, 94, 0.1) !important;
-    }
+    calculator_panel()
     
-    .info-section {
-        background: linear-gradient(135deg, #eff6ff, #e0f2fe);
-        padding: 1.5rem;
-        border-radius: 12px;
-        border: 1px solid rgba(59, 130, 246, 0.2);
-        margin-top: 2rem;
-    }
+    bulk_import_section()
     
-    .status-message {
-        padding: 1rem 1.5rem;
-        border-radius: 8px;
-        margin: 1rem 0;
-        font-weight: 500;
-    }
+    history_section()
     
-    .status-warning {
-        background: linear-gradient(135deg, #fef3c7, #fde68a);
-        border: 1px solid #f59e0b;
-        color: #92400e;
-    }
+    dashboard_section()
     
-    .status-info {
-        background: linear-gradient(135deg, #dbeafe, #bfdbfe);
-        border: 1px solid #3b82f6;
-        color: #1e40af;
-    }
+    solver_section()
     
-    .status-error {
-        background: linear-gradient(135deg, #fee2e2, #fecaca);
-        border: 1px solid #ef4444;
-        color: #dc2626;
-    }
+    season_section()
     
-    /* Hide Streamlit default elements */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    .stDeployButton {display:none;}
-    </style>
-    """, unsafe_allow_html=True)
+    sweep_section()
     
-    # Modern header with glassmorphism effect
-    st.markdown("""
-    <div class="main-header">
-        <h1>🌱 Calculadora de Abono</h1>
-        <p>Calcula el gasto de abono en riegos de invernaderos</p>
-    </div>
-    """, unsafe_allow_html=True)
+    if is_admin():
+        admin_panel()
     
+    # Footer with instructions
+    st.markdown(FOOTER_HTML, unsafe_allow_html=True)
+
+# Default stock tanks: A and B split the fertilizer, the acid has a fixed ratio
+RECETA_TANQUES = [
+    {'tanque': 'A', 'reparto': 0.5, 'concentracion': 0.1, 'proporcion': 0.0},
+    {'tanque': 'B', 'reparto': 0.5, 'concentracion': 0.1, 'proporcion': 0.0},
+    {'tanque': 'Ácido', 'reparto': 0.0, 'concentracion': 0.5, 'proporcion': 2000.0},
+]
+
+# Default sectors of a greenhouse: drip lines with different emitters
+SECTORES_INVERNADERO = [
+    {'superficie': 2000.0, 'goteros_totales': 4000, 'caudal_gotero': 2.0, 'ce_abono': 1.5, 'tiempo_riego': 30.0},
+    {'superficie': 1000.0, 'goteros_totales': 1500, 'caudal_gotero': 4.0, 'ce_abono': 1.5, 'tiempo_riego': 20.0},
+]
+
+def sector_panel(numero_invernadero):
+    """Sector table of a greenhouse with several irrigation sectors.
+
+    Every sector is computed in one calculate_sectors() pass. Returns the
+    greenhouse report of sectors.iter_greenhouse_reports(): the totals with
+    their equivalent inputs and the per-sector rows under 'sectores', or
+    None while no sector has valid greenhouse values.
+    """
+    st.markdown("Sectores (superficie, goteros, caudal del gotero, CE y minutos de riego de cada uno):")
+    filas = st.data_editor(SECTORES_INVERNADERO, num_rows="dynamic", hide_index=True, key="sectores_invernadero")
+    
+    from sectors import calculate_sectors, iter_greenhouse_reports
+    
+    with timed('sectores'):
+        resultado = calculate_sectors(
+            [numero_invernadero] * len(filas),
+            *([float(fila.get(campo) or 0) for fila in filas] for campo in INPUT_FIELDS)
+        )
+    informe = next(iter_greenhouse_reports(resultado), None)
+    if informe is None or not informe['superficie'] > 0:
+        st.info("Introduce la superficie, los goteros y el caudal de al menos un sector")
+        return None
+    
+    st.dataframe(
+        [
+            {
+                'Sector': sector['sector'],
+                'Agua (L)': round(sector['agua_gastada_riego'], 2),
+                'Abono (Kg)': round(sector['abono_gastado'], 2)
+            }
+            for sector in informe['sectores']
+        ],
+        hide_index=True
+    )
+    return informe
+
+def recipe_panel(calculo):
+    """Optional stock tank recipe for the current result.
+
+    Returns the calculation to report: calculo itself, or a dict with its
+    per-tank injection under 'tanques' when a valid recipe is in use.
+    """
+    if not st.toggle("🧪 Receta con varios tanques", key="receta_activa"):
+        return calculo
+    
+    st.markdown("Tanques (reparto del abono, Kg por litro de solución madre y proporción 1:N del inyector si es fija):")
+    tanques = st.data_editor(RECETA_TANQUES, num_rows="dynamic", hide_index=True, key="receta_tanques")
+    
+    from recipes import build_recipe, recipe_for_event
+    
+    try:
+        filas = recipe_for_event(calculo, build_recipe(tanques))
+    except ValueError as e:
+        st.error(f"Receta no válida: {str(e)}")
+        return calculo
+    
+    st.dataframe(
+        [
+            {
+                'Tanque': fila['tanque'],
+                'Abono (Kg)': round(fila['kg'], 2),
+                'Solución madre (L)': round(fila['litros'], 2),
+                'Inyección (L/h)': round(fila['caudal_inyeccion'], 2),
+                'Proporción': f"1:{fila['proporcion']:.0f}" if fila['proporcion'] else '-'
+            }
+            for fila in filas
+        ],
+        hide_index=True
+    )
+    return {**calculo, 'tanques': filas}
+
+def rerun_dependent_sections(*entradas):
+    """Rerun the whole page when inputs read by other sections change.
+
+    The season, solver and sweep sections are fragments of their own that
+    read the greenhouse inputs from the session state, and editing them only
+    reruns the calculator; the values they saw are kept to compare against.
+    """
+    if st.session_state.setdefault('_entradas_secciones', entradas) != entradas:
+        st.session_state['_entradas_secciones'] = entradas
+        st.rerun(scope="app")
+
+def fill_from_registry():
+    """Fill the static greenhouse fields from the registry selection"""
+    datos = get_registry().get(st.session_state['invernadero_registrado'])
+    if datos is None:
+        return
+    for campo in ('numero_invernadero', 'superficie', 'goteros_totales', 'caudal_gotero'):
+        st.session_state[campo] = datos[campo]
+
+@st.fragment
+def calculator_panel():
+    """Input form and results.
+
+    Runs as a fragment: editing an input only reruns this panel, not the
+    header, stylesheet or footer of the page. Results are memoized by input
+    values and the PDF/share work only runs when its button is pressed.
+    """
     # Create two columns for better layout
     col1, col2 = st.columns([1, 1])
     
@@ -356,10 +618,29 @@ def main():
         st.markdown('<div class="section-card">', unsafe_allow_html=True)
         st.markdown('<div class="section-title">📊 Datos de Entrada</div>', unsafe_allow_html=True)
         
-        # Input fields with session state keys for proper reset functionality
+        registro = get_registry()
+        if len(registro):
+            st.selectbox(
+                "Invernadero registrado:",
+                [''] + registro.ids(),
+                format_func=lambda numero: numero or '— Introducir datos a mano —',
+                help="Rellena la superficie, los goteros y el caudal con los datos guardados del invernadero",
+                on_change=fill_from_registry,
+                key="invernadero_registrado"
+            )
+        
+        # With several sectors the greenhouse is described in the sector table
+        por_sectores = st.toggle(
+            "🧩 Varios sectores de riego",
+            help="Para invernaderos con distintos goteros, caudales, CE o tiempos en cada sector",
+            key="sectores_activos"
+        )
+        
+        # Input fields with session state keys for proper reset functionality.
+        # The greenhouse fields start at their minimum (no explicit value) so
+        # the registry selection can fill them through the session state.
         numero_invernadero = st.text_input(
             "Número de invernadero:",
-            value="",
             help="Identificador del invernadero",
             key="numero_invernadero"
         )
@@ -367,29 +648,29 @@ def main():
         superficie = st.number_input(
             "Superficie del invernadero (m²):",
             min_value=0.0,
-            value=0.0,
             step=1.0,
             format="%.2f",
             help="Superficie total del invernadero en metros cuadrados",
+            disabled=por_sectores,
             key="superficie"
         )
         
         goteros_totales = st.number_input(
             "Goteros totales:",
             min_value=0,
-            value=0,
             step=1,
             help="Número total de goteros en el invernadero",
+            disabled=por_sectores,
             key="goteros_totales"
         )
         
         caudal_gotero = st.number_input(
             "Caudal de cada gotero (L×H⁻¹):",
             min_value=0.0,
-            value=0.0,
             step=0.1,
             format="%.2f",
             help="Caudal de cada gotero en litros por hora",
+            disabled=por_sectores,
             key="caudal_gotero"
         )
         
@@ -400,6 +681,7 @@ def main():
             step=0.1,
             format="%.2f",
             help="Conductividad eléctrica del abono",
+            disabled=por_sectores,
             key="ce_abono"
         )
         
@@ -410,10 +692,28 @@ def main():
             step=1.0,
             format="%.1f",
             help="Duración del riego en minutos",
+            disabled=por_sectores,
             key="tiempo_riego"
         )
         st.markdown('</div>', unsafe_allow_html=True)
     
+    entradas = (superficie, goteros_totales, caudal_gotero)
+    if st.session_state.get('sensibilidad_visible'):
+        # The open sweep also takes the CE and time of the form
+        entradas += (ce_abono, tiempo_riego)
+    rerun_dependent_sections(*entradas)
+    
+    sectores = None
+    if por_sectores:
+        with col1:
+            informe_sectores = sector_panel(numero_invernadero)
+        if informe_sectores is None:
+            superficie = goteros_totales = caudal_gotero = 0
+        else:
+            # The greenhouse totals go through the form's path with their equivalent inputs
+            superficie, goteros_totales, caudal_gotero, ce_abono, tiempo_riego = (informe_sectores[campo] for campo in INPUT_FIELDS)
+            sectores = informe_sectores['sectores']
+    
     with col2:
         st.markdown('<div class="section-card">', unsafe_allow_html=True)
         st.markdown('<div class="section-title">📈 Resultados Calculados</div>', unsafe_allow_html=True)
@@ -428,51 +728,32 @@ def main():
         if superficie > 0 and goteros_totales > 0 and caudal_gotero > 0:
             try:
                 # Calculate derived values
-                goteros_por_metro = goteros_totales / superficie
-                litros_agua_hora = superficie * goteros_por_metro * caudal_gotero
-                caudal_1000m2_hora = litros_agua_hora / (superficie / 1000)
+                with timed('calculo'):
+                    registrado = registro.get(numero_invernadero)
+                    if registrado is not None and (registrado['superficie'], registrado['goteros_totales'], registrado['caudal_gotero']) == (superficie, goteros_totales, caudal_gotero):
+                        # Static results are precomputed; only time and CE remain
+                        resultados = registro.calculate_event(numero_invernadero, ce_abono, tiempo_riego)
+                    else:
+                        resultados = calculate_cached(superficie, goteros_totales, caudal_gotero, ce_abono, tiempo_riego)
+                goteros_por_metro = resultados['goteros_por_metro']
+                litros_agua_hora = resultados['litros_agua_hora']
+                caudal_1000m2_hora = resultados['caudal_1000m2_hora']
+                agua_gastada_riego = resultados['agua_gastada_riego']
                 
                 # Display derived calculations with modern styling
-                st.markdown(f'''
-                <div class="metric-card">
-                    <h4 style="color: #1a202c; margin: 0; font-weight: 600;">💧 Goteros por metro cuadrado</h4>
-                    <p style="font-size: 1.4rem; font-weight: 700; margin: 0.75rem 0; color: #16a34a;">{goteros_por_metro:.4f}</p>
-                    <small style="color: #64748b; font-weight: 500;">Goteros totales / Superficie del invernadero</small>
-                </div>
-                ''', unsafe_allow_html=True)
+                metric_card("💧 Goteros por metro cuadrado", f"{goteros_por_metro:.4f}", "Goteros totales / Superficie del invernadero")
                 
-                st.markdown(f'''
-                <div class="metric-card">
-                    <h4 style="color: #1a202c; margin: 0; font-weight: 600;">🚰 Litros de agua por hora</h4>
-                    <p style="font-size: 1.4rem; font-weight: 700; margin: 0.75rem 0; color: #16a34a;">{litros_agua_hora:.2f} L</p>
-                    <small style="color: #64748b; font-weight: 500;">Superficie × Goteros por m² × Caudal de cada gotero</small>
-                </div>
-                ''', unsafe_allow_html=True)
+                metric_card("🚰 Litros de agua por hora", f"{litros_agua_hora:.2f} L", "Superficie × Goteros por m² × Caudal de cada gotero")
                 
-                st.markdown(f'''
-                <div class="metric-card">
-                    <h4 style="color: #1a202c; margin: 0; font-weight: 600;">⚡ Caudal cada 1000 m² por hora</h4>
-                    <p style="font-size: 1.4rem; font-weight: 700; margin: 0.75rem 0; color: #16a34a;">{caudal_1000m2_hora:.2f} L</p>
-                    <small style="color: #64748b; font-weight: 500;">Litros de agua por hora / (Superficie / 1000)</small>
-                </div>
-                ''', unsafe_allow_html=True)
+                metric_card("⚡ Caudal cada 1000 m² por hora", f"{caudal_1000m2_hora:.2f} L", "Litros de agua por hora / (Superficie / 1000)")
                 
                 # Calculate water consumed for this irrigation
                 if tiempo_riego > 0:
-                    agua_gastada_riego = ((superficie * goteros_por_metro * caudal_gotero) / 60) * tiempo_riego
-                    
-                    st.markdown(f'''
-                    <div class="metric-card">
-                        <h4 style="color: #1a202c; margin: 0; font-weight: 600;">🌊 Cantidad de Agua gastada en este riego</h4>
-                        <p style="font-size: 1.4rem; font-weight: 700; margin: 0.75rem 0; color: #16a34a;">{agua_gastada_riego:.2f} L</p>
-                        <small style="color: #64748b; font-weight: 500;">((Superficie × Goteros por m² × Caudal) / 60) × Tiempo de riego</small>
-                    </div>
-                    ''', unsafe_allow_html=True)
+                    metric_card("🌊 Cantidad de Agua gastada en este riego", f"{agua_gastada_riego:.2f} L", "((Superficie × Goteros por m² × Caudal) / 60) × Tiempo de riego")
                 
                 # Calculate final fertilizer consumption if all parameters are available
                 if ce_abono > 0 and tiempo_riego > 0:
-                    # Formula: (Caudal cada1000m2 a la hora / 100000) * CE del abono * Tiempo de riego * (Superficie/1000)
-                    abono_gastado = (caudal_1000m2_hora / 100000) * ce_abono * tiempo_riego * (superficie / 1000)
+                    abono_gastado = resultados['abono_gastado']
                     
                     # Display the final result prominently with custom styling
                     st.markdown(f'''
@@ -484,32 +765,31 @@ def main():
                     </div>
                     ''', unsafe_allow_html=True)
                     
+                    calculo = Calculation(
+                        numero_invernadero, superficie, goteros_totales, caudal_gotero, ce_abono, tiempo_riego,
+                        **resultados
+                    )
+                    # The PDF and the share text carry the recipe when one is in use
+                    informe = recipe_panel(calculo)
+                    if sectores:
+                        informe = {**informe, 'sectores': sectores}
+                    
                     # Action buttons
                     st.markdown("---")
-                    col_btn1, col_btn2, col_btn3 = st.columns(3)
+                    col_btn0, col_btn1, col_btn2, col_btn3 = st.columns(4)
+                    
+                    with col_btn0:
+                        # Only this button records the irrigation in the history; the
+                        # PDF and share buttons can be pressed for it any number of times
+                        if st.button("💾 Guardar en historial") and record_calculation(calculo):
+                            st.toast("Cálculo guardado en el historial")
                     
                     with col_btn1:
                         # PDF Download button
                         if st.button("📄 Guardar PDF", type="primary"):
-                            # Calculate water consumed for PDF
-                            agua_gastada_riego = ((superficie * goteros_por_metro * caudal_gotero) / 60) * tiempo_riego if tiempo_riego > 0 else 0
-                            
-                            pdf_data = {
-                                'numero_invernadero': numero_invernadero,
-                                'superficie': superficie,
-                                'goteros_totales': goteros_totales,
-                                'caudal_gotero': caudal_gotero,
-                                'ce_abono': ce_abono,
-                                'tiempo_riego': tiempo_riego,
-                                'goteros_por_metro': goteros_por_metro,
-                                'litros_agua_hora': litros_agua_hora,
-                                'caudal_1000m2_hora': caudal_1000m2_hora,
-                                'agua_gastada_riego': agua_gastada_riego,
-                                'abono_gastado': abono_gastado
-                            }
-                            
                             try:
-                                pdf_bytes = generate_pdf_report(pdf_data)
+                                with timed('pdf'):
+                                    pdf_bytes = cached_pdf_report(informe)
                                 fecha_archivo = datetime.now().strftime("%Y%m%d_%H%M")
                                 nombre_archivo = f"calculo_abono_{numero_invernadero}_{fecha_archivo}.pdf" if numero_invernadero else f"calculo_abono_{fecha_archivo}.pdf"
                                 
@@ -525,74 +805,13 @@ def main():
                     with col_btn2:
                         # Share button
                         if st.button("🔗 Compartir"):
-                            # Calculate water consumed for sharing
-                            agua_gastada_riego = ((superficie * goteros_por_metro * caudal_gotero) / 60) * tiempo_riego if tiempo_riego > 0 else 0
-                            
-                            share_data = {
-                                'numero_invernadero': numero_invernadero,
-                                'superficie': superficie,
-                                'goteros_totales': goteros_totales,
-                                'caudal_gotero': caudal_gotero,
-                                'ce_abono': ce_abono,
-                                'tiempo_riego': tiempo_riego,
-                                'goteros_por_metro': goteros_por_metro,
-                                'litros_agua_hora': litros_agua_hora,
-                                'caudal_1000m2_hora': caudal_1000m2_hora,
-                                'agua_gastada_riego': agua_gastada_riego,
-                                'abono_gastado': abono_gastado
-                            }
-                            
-                            try:
-                                # Generate PDF
-                                pdf_bytes = generate_pdf_report(share_data)
-                                fecha_archivo = datetime.now().strftime("%Y%m%d_%H%M")
-                                nombre_archivo = f"calculo_abono_{numero_invernadero}_{fecha_archivo}.pdf" if numero_invernadero else f"calculo_abono_{fecha_archivo}.pdf"
-                                
-                                # Create sharing options
-                                st.markdown("### 📤 Compartir Resultados")
-                                
-                                # Download PDF first
-                                st.download_button(
-                                    label="📄 Descargar PDF para compartir",
-                                    data=pdf_bytes,
-                                    file_name=nombre_archivo,
-                                    mime="application/pdf",
-                                    key="share_download"
-                                )
-                                
-                                # Base64 encode PDF for sharing links
-                                pdf_b64 = base64.b64encode(pdf_bytes).decode()
-                                
-                                # Sharing text for social media
-                                share_text = f"🌱 Resultados de mi cálculo de abono para invernaderos:\n\n"
-                                share_text += f"📊 Invernadero: {numero_invernadero if numero_invernadero else 'No especificado'}\n"
-                                share_text += f"🎯 Abono gastado: {abono_gastado:.2f} Kg\n"
-                                share_text += f"💧 Agua gastada: {agua_gastada_riego:.2f} L\n\n"
-                                share_text += "Calculado con: https://calculadora-abono-invernaderos.replit.app"
-                                
-                                # Create sharing buttons
-                                col_email, col_whatsapp, col_telegram = st.columns(3)
-                                
-                                with col_email:
-                                    email_subject = "Resultados Calculadora de Abono"
-                                    email_body = share_text.replace('\n', '%0D%0A')
-                                    email_link = f"mailto:?subject={email_subject}&body={email_body}"
-                                    st.markdown(f'<a href="{email_link}" target="_blank"><button style="background: #4CAF50; color: white; border: none; padding: 10px 15px; border-radius: 5px; cursor: pointer; width: 100%;">📧 Email</button></a>', unsafe_allow_html=True)
-                                
-                                with col_whatsapp:
-                                    whatsapp_text = share_text.replace('\n', '%0A')
-                                    whatsapp_link = f"https://wa.me/?text={whatsapp_text}"
-                                    st.markdown(f'<a href="{whatsapp_link}" target="_blank"><button style="background: #25D366; color: white; border: none; padding: 10px 15px; border-radius: 5px; cursor: pointer; width: 100%;">📱 WhatsApp</button></a>', unsafe_allow_html=True)
-                                
-                                with col_telegram:
-                                    telegram_text = share_text.replace('\n', '%0A')
-                                    telegram_link = f"https://t.me/share/url?text={telegram_text}"
-                                    st.markdown(f'<a href="{telegram_link}" target="_blank"><button style="background: #0088cc; color: white; border: none; padding: 10px 15px; border-radius: 5px; cursor: pointer; width: 100%;">✈️ Telegram</button></a>', unsafe_allow_html=True)
-                                
-                                st.info("💡 Primero descarga el PDF, luego usa los botones para compartir el resumen por redes sociales")
-                                
-                            except Exception as e:
-                                st.error(f"Error generando PDF para compartir: {str(e)}")
+                            # Text and links are instant; the PDF waits until it's asked for
+                            st.session_state['share_job'] = (informe, build_share_package(informe))
+                            st.session_state.pop('share_pdf_job', None)
+                        
+                        share_job = st.session_state.get('share_job')
+                        if share_job is not None and share_job[0] == informe:
+                            share_panel()
                     
                     with col_btn3:
                         # Reset button
@@ -624,19 +843,6 @@ def main():
         
         st.markdown('</div>', unsafe_allow_html=True)
     
-    # Footer with instructions
-    st.markdown("""
-    <div class="info-section" style="margin-top: 2rem;">
-        <h4 style="color: #1976D2; margin-top: 0;">ℹ️ Instrucciones de uso</h4>
-        <ol style="margin: 1rem 0;">
-            <li>Introduce todos los datos de entrada en los campos de la izquierda</li>
-            <li>Los cálculos se actualizarán automáticamente</li>
-            <li>El resultado final del abono gastado aparecerá cuando todos los campos estén completos</li>
-            <li>Usa los botones para guardar en PDF, compartir o reiniciar</li>
-        </ol>
-    </div>
-    """, unsafe_allow_html=True)
-    
     if numero_invernadero:
         st.markdown(f"""
         <div style="background: #e8f5e8; padding: 1rem; border-radius: 8px; border-left: 4px solid #4CAF50; margin-top: 1rem;">
@@ -644,5 +850,7 @@ def main():
         </div>
         """, unsafe_allow_html=True)
 
+metrics.start_metrics_server()
+
 if __name__ == "__main__":
     main()
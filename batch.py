@@ -0,0 +1,139 @@
+import csv
+import io
+import json
+from itertools import islice
+
+import numpy as np
+
+# EVENT_FIELDS are the columns expected in an imported file and
+# OUTPUT_FIELDS the ones written for every processed event
+from calculations import EVENT_FIELDS, INPUT_FIELDS, OUTPUT_FIELDS, calculate_batch
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+def _to_float(value, decimal_comma=False):
+    """Parse a numeric cell, returning NaN for empty or invalid values"""
+    if decimal_comma:
+        value = value.replace(',', '.')
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def _check_columns(columns, fields):
+    """Raise ValueError if any of the expected columns is missing"""
+    faltan = [campo for campo in fields if campo not in columns]
+    if faltan:
+        raise ValueError(f"Faltan columnas en el archivo: {', '.join(faltan)}")
+
+def read_csv_chunks(stream, chunk_size=DEFAULT_CHUNK_SIZE, fields=EVENT_FIELDS):
+    """Yield chunks of events from a CSV text stream as dicts of columns.
+
+    fields lists the columns to read: the first one is the text identifier
+    and the rest are numeric (EVENT_FIELDS by default).
+
+    The delimiter is detected from the header line, so files exported with
+    ';' and decimal commas (the usual Spanish spreadsheet format) are also
+    accepted. Numeric cells that can't be parsed become NaN and are treated
+    as invalid input by calculate_batch().
+    """
+    header = stream.readline()
+    delimiter = ';' if header.count(';') > header.count(',') else ','
+    if '\t' in header and delimiter not in header:
+        delimiter = '\t'
+    decimal_comma = delimiter != ','
+
+    columns = next(csv.reader([header], delimiter=delimiter), [])
+    columns = [columna.strip() for columna in columns]
+    _check_columns(columns, fields)
+    indices = [columns.index(campo) for campo in fields]
+
+    reader = csv.reader(stream, delimiter=delimiter)
+    while True:
+        rows = [row for row in islice(reader, chunk_size) if row]
+        if not rows:
+            break
+        chunk = {fields[0]: [row[indices[0]].strip() if len(row) > indices[0] else '' for row in rows]}
+        for campo, indice in zip(fields[1:], indices[1:]):
+            chunk[campo] = np.array(
+                [_to_float(row[indice], decimal_comma) if len(row) > indice else np.nan for row in rows],
+                dtype=np.float64
+            )
+        yield chunk
+
+def read_parquet_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE, fields=EVENT_FIELDS):
+    """Yield chunks of events from a Parquet file as dicts of columns, like read_csv_chunks()"""
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(source)
+    _check_columns(parquet_file.schema_arrow.names, fields)
+
+    for record_batch in parquet_file.iter_batches(batch_size=chunk_size, columns=list(fields)):
+        chunk = {fields[0]: ['' if v is None else str(v) for v in record_batch.column(fields[0]).to_pylist()]}
+        for campo in fields[1:]:
+            columna = record_batch.column(campo).cast('float64')
+            chunk[campo] = columna.to_numpy(zero_copy_only=False)
+        yield chunk
+
+def read_event_chunks(source, file_name, chunk_size=DEFAULT_CHUNK_SIZE, fields=EVENT_FIELDS):
+    """Yield event chunks from a binary file object, picking the reader by extension"""
+    if file_name.lower().endswith('.parquet'):
+        yield from read_parquet_chunks(source, chunk_size, fields)
+    else:
+        stream = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+        try:
+            yield from read_csv_chunks(stream, chunk_size, fields)
+        finally:
+            # Don't close the caller's file along with the wrapper
+            stream.detach()
+
+def compute_chunk(chunk):
+    """Add the derived columns to a chunk of events"""
+    resultados = calculate_batch(*(chunk[campo] for campo in INPUT_FIELDS))
+    del resultados['valido']
+    return {**chunk, **resultados}
+
+def compute_chunks(chunks):
+    """Lazily compute the derived columns for a stream of chunks"""
+    for chunk in chunks:
+        yield compute_chunk(chunk)
+
+def write_csv_chunks(chunks, stream):
+    """Write computed chunks to a CSV text stream, one chunk at a time.
+
+    Returns the number of events written.
+    """
+    writer = csv.writer(stream)
+    writer.writerow(OUTPUT_FIELDS)
+    total = 0
+    for chunk in chunks:
+        numeric = np.column_stack([chunk[campo] for campo in OUTPUT_FIELDS[1:]]).tolist()
+        writer.writerows([numero, *valores] for numero, valores in zip(chunk['numero_invernadero'], numeric))
+        total += len(numeric)
+    return total
+
+def write_json_chunks(chunks, stream):
+    """Write computed chunks to a text stream as a JSON array, one chunk at a time.
+
+    Returns the number of events written.
+    """
+    stream.write('[')
+    total = 0
+    for record in iter_records(chunks):
+        stream.write(',\n' if total else '\n')
+        # NaN inputs are written as null so the output stays valid JSON
+        json.dump({k: None if v != v else v for k, v in record.items()}, stream, ensure_ascii=False)
+        total += 1
+    stream.write('\n]\n' if total else ']\n')
+    return total
+
+def iter_records(chunks):
+    """Yield every event of a stream of chunks as a Calculation, as used by the reports"""
+    from records import Calculation
+
+    for chunk in chunks:
+        numeric = np.column_stack([chunk[campo] for campo in OUTPUT_FIELDS[1:]]).tolist()
+        for numero, valores in zip(chunk['numero_invernadero'], numeric):
+            if valores[1].is_integer():
+                valores[1] = int(valores[1])
+            yield Calculation(numero, *valores)
@@ -0,0 +1,268 @@
+"""Benchmarks for the calculation core, PDF rendering and sharing.
+
+    python bench.py                          # run everything, print JSON
+    python bench.py -o resultados.json       # also save the results
+    python bench.py --baseline base.json     # compare, exit 1 on regressions
+    python bench.py --quick -k pdf           # smaller sizes, only matching names
+
+Every benchmark reports its time in 'seconds' (lower is better); that is the
+value compared against the baseline. Inputs are generated from a fixed seed
+so runs are reproducible.
+
+import_app also enforces the cold-start budget: importing app.py must take
+less than --import-budget seconds (ABONO_IMPORT_BUDGET, 1.0 by default) and
+must not load any of LAZY_MODULES, or the run exits with status 1.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+BENCHMARKS = {}
+
+# The modules under test, imported from here whatever the caller's directory
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_BUDGET_SECONDS = float(os.environ.get('ABONO_IMPORT_BUDGET', 1.0))
+
+# Dependencies that app.py only loads on first use
+LAZY_MODULES = ('numpy', 'pandas', 'pyarrow', 'altair', 'reportlab')
+
+SAMPLE = {
+    'numero_invernadero': '7',
+    'superficie': 2000.0,
+    'goteros_totales': 4000,
+    'caudal_gotero': 3.0,
+    'ce_abono': 1.5,
+    'tiempo_riego': 30.0,
+    'goteros_por_metro': 2.0,
+    'litros_agua_hora': 12000.0,
+    'caudal_1000m2_hora': 6000.0,
+    'agua_gastada_riego': 6000.0,
+    'abono_gastado': 5.4,
+    'fecha': '01/01/2026 08:00'
+}
+
+def benchmark(name):
+    """Register a benchmark; it receives the quick flag and returns a dict of metrics"""
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+def _timeit(func, repeat):
+    """Median and p95 wall time of repeated calls"""
+    tiempos = []
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        func()
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    return {
+        'seconds': statistics.median(tiempos),
+        'p95_seconds': tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))]
+    }
+
+def _peak_memory(func):
+    """Peak Python memory allocated while running func, in bytes"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def _random_inputs(n):
+    import numpy as np
+
+    rng = np.random.default_rng(42)
+    return (
+        rng.uniform(100, 10000, n),
+        rng.integers(100, 20000, n).astype(np.float64),
+        rng.uniform(0.5, 8, n),
+        rng.uniform(0.5, 4, n),
+        rng.uniform(5, 90, n)
+    )
+
+@benchmark('calculate_scalar')
+def bench_calculate_scalar(quick):
+    from calculations import calculate
+
+    n = 10_000 if quick else 100_000
+    entradas = list(zip(*(v.tolist() for v in _random_inputs(n))))
+
+    def run():
+        for valores in entradas:
+            calculate(*valores)
+
+    result = _timeit(run, 3 if quick else 5)
+    result['events'] = n
+    result['events_per_second'] = n / result['seconds']
+    return result
+
+@benchmark('calculate_batch')
+def bench_calculate_batch(quick):
+    from calculations import calculate_batch
+
+    n = 100_000 if quick else 1_000_000
+    entradas = _random_inputs(n)
+    result = _timeit(lambda: calculate_batch(*entradas), 3 if quick else 5)
+    result['events'] = n
+    result['events_per_second'] = n / result['seconds']
+    result['peak_memory_bytes'] = _peak_memory(lambda: calculate_batch(*entradas))
+    return result
+
+@benchmark('pdf_report_single')
+def bench_pdf_report_single(quick):
+    from report import generate_pdf_report
+
+    generate_pdf_report(SAMPLE)  # warm up styles and fonts
+    result = _timeit(lambda: generate_pdf_report(SAMPLE), 10 if quick else 30)
+    result['peak_memory_bytes'] = _peak_memory(lambda: generate_pdf_report(SAMPLE))
+    return result
+
+@benchmark('pdf_report_farm')
+def bench_pdf_report_farm(quick):
+    from report import generate_farm_report
+
+    n = 100 if quick else 1000
+    registros = [dict(SAMPLE, numero_invernadero=str(i)) for i in range(n)]
+    result = _timeit(lambda: generate_farm_report(registros), 1 if quick else 3)
+    result['greenhouses'] = n
+    result['peak_memory_bytes'] = _peak_memory(lambda: generate_farm_report(registros))
+    return result
+
+@benchmark('share_text')
+def bench_share_text(quick):
+    from share import build_share_links, generate_share_text
+
+    n = 1_000 if quick else 10_000
+
+    def run():
+        for _ in range(n):
+            build_share_links(generate_share_text(SAMPLE))
+
+    result = _timeit(run, 3 if quick else 5)
+    result['texts'] = n
+    result['texts_per_second'] = n / result['seconds']
+    return result
+
+@benchmark('share_text_batch')
+def bench_share_text_batch(quick):
+    from batch import compute_chunk
+    from calculations import INPUT_FIELDS
+    from share import build_share_links, generate_batch_share_text
+
+    n = 100_000 if quick else 1_000_000
+    entradas = _random_inputs(n)
+    chunk = compute_chunk({
+        'numero_invernadero': [str(i % 500) for i in range(n)],
+        **dict(zip(INPUT_FIELDS, entradas))
+    })
+    result = _timeit(lambda: build_share_links(generate_batch_share_text([chunk])), 3 if quick else 5)
+    result['events'] = n
+    result['events_per_second'] = n / result['seconds']
+    return result
+
+def _import_time(module):
+    """Wall time of importing module in a fresh interpreter, and the LAZY_MODULES it loaded"""
+    codigo = (
+        f"import sys, time; t = time.perf_counter(); import {module}; t = time.perf_counter() - t; "
+        f"print(t, *[m for m in {LAZY_MODULES!r} if m in sys.modules])"
+    )
+    salida = subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True, check=True, cwd=REPO_DIR)
+    segundos, *cargados = salida.stdout.strip().splitlines()[-1].split()
+    return float(segundos), cargados
+
+@benchmark('import_app')
+def bench_import_app(quick):
+    _, cargados = _import_time('app')  # also warms up the bytecode and filesystem caches
+    tiempos = sorted(_import_time('app')[0] for _ in range(3 if quick else 7))
+    return {'seconds': statistics.median(tiempos), 'max_seconds': tiempos[-1], 'eager_modules': cargados}
+
+def check_import_budget(result, budget):
+    """Problems with the import_app result against the cold-start budget"""
+    problemas = []
+    if result['seconds'] > budget:
+        problemas.append(f"importar app.py tarda {result['seconds']:.3f} s (límite {budget:.3f} s)")
+    if result['eager_modules']:
+        problemas.append(f"app.py carga al importarse: {', '.join(result['eager_modules'])}")
+    return problemas
+
+def compare(results, baseline, tolerance):
+    """Benchmarks whose time grew more than tolerance over the baseline"""
+    regresiones = []
+    for name, result in results.items():
+        anterior = baseline.get('results', {}).get(name)
+        if not anterior:
+            continue
+        ratio = result['seconds'] / anterior['seconds']
+        result['baseline_seconds'] = anterior['seconds']
+        result['ratio'] = ratio
+        if ratio > 1 + tolerance:
+            regresiones.append(name)
+    return regresiones
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='bench.py', description='Benchmarks de la calculadora de abono')
+    parser.add_argument('-k', '--filter', default='', help='solo los benchmarks cuyo nombre contiene este texto')
+    parser.add_argument('--quick', action='store_true', help='tamaños reducidos para una comprobación rápida')
+    parser.add_argument('-o', '--output', help='guardar los resultados en este archivo JSON')
+    parser.add_argument('--baseline', help='archivo JSON de una ejecución anterior con el que comparar')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='aumento relativo admitido frente a la referencia (por defecto 0.2)')
+    parser.add_argument(
+        '--import-budget',
+        type=float,
+        default=IMPORT_BUDGET_SECONDS,
+        help=f'segundos máximos para importar app.py (por defecto {IMPORT_BUDGET_SECONDS})'
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    results = {}
+    for name, func in BENCHMARKS.items():
+        if args.filter in name:
+            print(f'{name}...', file=sys.stderr)
+            results[name] = func(args.quick)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'quick': args.quick,
+        'results': results
+    }
+
+    regresiones = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regresiones = compare(results, json.load(f), args.tolerance)
+        report['regressions'] = regresiones
+
+    problemas = []
+    if 'import_app' in results:
+        problemas = check_import_budget(results['import_app'], args.import_budget)
+        report['import_budget'] = {'seconds': args.import_budget, 'problems': problemas}
+
+    salida = json.dumps(report, indent=2)
+    print(salida)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(salida + '\n')
+
+    for problema in problemas:
+        print(f"Presupuesto de arranque superado: {problema}", file=sys.stderr)
+    if regresiones:
+        print(f"Regresiones: {', '.join(regresiones)}", file=sys.stderr)
+    if regresiones or problemas:
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+# NumPy is only imported by calculate_batch(), so the scalar path and the
+# field lists stay cheap to import
+from functools import lru_cache
+
+# Input fields, in the same order as the widgets in the UI
+INPUT_FIELDS = (
+    'superficie',
+    'goteros_totales',
+    'caudal_gotero',
+    'ce_abono',
+    'tiempo_riego',
+)
+
+# Derived fields, in the same order as the results shown in the UI
+RESULT_FIELDS = (
+    'goteros_por_metro',
+    'litros_agua_hora',
+    'caudal_1000m2_hora',
+    'agua_gastada_riego',
+    'abono_gastado',
+)
+
+# Columns of an irrigation event, named after the widget keys in the UI
+EVENT_FIELDS = ('numero_invernadero',) + INPUT_FIELDS
+
+# Columns of a processed event
+OUTPUT_FIELDS = EVENT_FIELDS + RESULT_FIELDS
+
+def calculate(superficie, goteros_totales, caudal_gotero, ce_abono, tiempo_riego):
+    """Calculate all derived values for a single irrigation event.
+
+    Follows the same rules as the UI: the emitter values are only computed
+    when superficie, goteros_totales and caudal_gotero are positive, the water
+    used needs a positive tiempo_riego and the fertilizer used also needs a
+    positive ce_abono. Anything that can't be computed is returned as 0.
+    """
+    goteros_por_metro = 0
+    litros_agua_hora = 0
+    caudal_1000m2_hora = 0
+    agua_gastada_riego = 0
+    abono_gastado = 0
+
+    if superficie > 0 and goteros_totales > 0 and caudal_gotero > 0:
+        goteros_por_metro = goteros_totales / superficie
+        litros_agua_hora = superficie * goteros_por_metro * caudal_gotero
+        caudal_1000m2_hora = litros_agua_hora / (superficie / 1000)
+
+        if tiempo_riego > 0:
+            agua_gastada_riego = ((superficie * goteros_por_metro * caudal_gotero) / 60) * tiempo_riego
+
+        if ce_abono > 0 and tiempo_riego > 0:
+            # Formula: (Caudal cada1000m2 a la hora / 100000) * CE del abono * Tiempo de riego * (Superficie/1000)
+            abono_gastado = (caudal_1000m2_hora / 100000) * ce_abono * tiempo_riego * (superficie / 1000)
+
+    return {
+        'goteros_por_metro': goteros_por_metro,
+        'litros_agua_hora': litros_agua_hora,
+        'caudal_1000m2_hora': caudal_1000m2_hora,
+        'agua_gastada_riego': agua_gastada_riego,
+        'abono_gastado': abono_gastado
+    }
+
+# Memoized calculate() for the UI: results only depend on the five inputs.
+# It lives in this module rather than in app.py, which Streamlit executes
+# afresh on every full rerun, so it is shared by all reruns and sessions of
+# the process. The returned dicts are shared too and must not be modified.
+calculate_cached = lru_cache(maxsize=1024)(calculate)
+
+def calculate_batch(superficie, goteros_totales, caudal_gotero, ce_abono, tiempo_riego):
+    """Vectorized version of calculate() for many irrigation events at once.
+
+    Every argument may be a scalar or an array-like; they are broadcast
+    against each other so a greenhouse's static values can be combined with
+    many events. Returns a dict with a float64 array for each field in
+    RESULT_FIELDS plus 'valido', a boolean mask of the events whose emitter
+    values could be computed. NaN or negative inputs count as invalid.
+    """
+    import numpy as np
+
+    superficie, goteros_totales, caudal_gotero, ce_abono, tiempo_riego = np.broadcast_arrays(
+        *(np.asarray(v, dtype=np.float64) for v in (superficie, goteros_totales, caudal_gotero, ce_abono, tiempo_riego))
+    )
+
+    # Comparisons with NaN are False, so NaN inputs fall out of the masks
+    valido = (superficie > 0) & (goteros_totales > 0) & (caudal_gotero > 0)
+    con_riego = valido & (tiempo_riego > 0)
+    con_abono = con_riego & (ce_abono > 0)
+
+    goteros_por_metro = np.zeros(valido.shape)
+    litros_agua_hora = np.zeros(valido.shape)
+    caudal_1000m2_hora = np.zeros(valido.shape)
+    agua_gastada_riego = np.zeros(valido.shape)
+    abono_gastado = np.zeros(valido.shape)
+
+    # Only divide where the inputs are valid so invalid rows never warn
+    np.divide(goteros_totales, superficie, out=goteros_por_metro, where=valido)
+    np.multiply(superficie * goteros_por_metro, caudal_gotero, out=litros_agua_hora, where=valido)
+    np.divide(litros_agua_hora, superficie / 1000, out=caudal_1000m2_hora, where=valido)
+    np.multiply(litros_agua_hora / 60, tiempo_riego, out=agua_gastada_riego, where=con_riego)
+    np.multiply(
+        (caudal_1000m2_hora / 100000) * ce_abono * tiempo_riego,
+        superficie / 1000,
+        out=abono_gastado,
+        where=con_abono
+    )
+
+    return {
+        'goteros_por_metro': goteros_por_metro,
+        'litros_agua_hora': litros_agua_hora,
+        'caudal_1000m2_hora': caudal_1000m2_hora,
+        'agua_gastada_riego': agua_gastada_riego,
+        'abono_gastado': abono_gastado,
+        'valido': valido
+    }
@@ -0,0 +1,164 @@
+"""Command line interface for batch calculations without the Streamlit UI.
+
+Reads irrigation events (CSV or Parquet, same columns as the form in app.py)
+from files or stdin and writes the results as CSV, JSON or PDF (a single
+report for one event, a consolidated farm report for several) or as a ZIP
+archive with one PDF report per event, rendered in parallel:
+
+    python cli.py riegos.csv -f json -o resultados.json
+    cat riegos.csv | python cli.py > resultados.csv
+    python cli.py riegos.csv -f zip --workers 16 -o informes.zip
+    python cli.py sectores.csv --sectores -f pdf -o invernaderos.pdf
+
+With --sectores every row is an irrigation sector and the results are the
+totals per greenhouse, with a table of its sectors in the PDF reports.
+--receta adds the injection of every stock tank of a recipe file (see
+recipes.py) to the PDF reports.
+
+Only the modules needed for the chosen output are imported, so neither
+streamlit nor reportlab are loaded unless a PDF is requested.
+"""
+import argparse
+import sys
+
+FORMATS = ('csv', 'json', 'pdf', 'zip')
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='cli.py',
+        description='Calculadora de abono para invernaderos en modo lote'
+    )
+    parser.add_argument(
+        'files',
+        nargs='*',
+        default=['-'],
+        help="archivos de riegos CSV o Parquet ('-' o ninguno para leer CSV de stdin)"
+    )
+    parser.add_argument('-f', '--format', choices=FORMATS, default='csv', help='formato de salida (por defecto csv)')
+    parser.add_argument('-o', '--output', default='-', help="archivo de salida ('-' para stdout, por defecto)")
+    parser.add_argument('--chunk-size', type=int, default=None, help='riegos procesados por bloque')
+    parser.add_argument(
+        '--sectores',
+        action='store_true',
+        help='cada fila es un sector de riego; calcula los totales por invernadero'
+    )
+    parser.add_argument(
+        '--receta',
+        help='archivo CSV de tanques (tanque, reparto, concentracion, proporcion) para los informes PDF'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='procesos para generar los informes con -f zip (por defecto, uno por CPU)'
+    )
+    return parser.parse_args(argv)
+
+def _iter_chunks(files, chunk_size):
+    """Yield event chunks from every input file in order"""
+    from batch import read_event_chunks
+
+    for file_name in files:
+        if file_name == '-':
+            yield from read_event_chunks(sys.stdin.buffer, '<stdin>', chunk_size)
+        else:
+            with open(file_name, 'rb') as source:
+                yield from read_event_chunks(source, file_name, chunk_size)
+
+class _count:
+    """Iterator wrapper that counts the items it yields"""
+
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self.total = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = next(self._iterator)
+        self.total += 1
+        return item
+
+def _open_output(path, binary=False):
+    if path == '-':
+        return sys.stdout.buffer if binary else sys.stdout
+    if binary:
+        return open(path, 'wb')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+def _print_progress(total):
+    # Overwrite the same line on a terminal, otherwise log now and then
+    if sys.stderr.isatty():
+        print(f'\r{total} informes generados', end='', file=sys.stderr, flush=True)
+    elif total % 100 == 0:
+        print(f'{total} informes generados', file=sys.stderr)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    from batch import DEFAULT_CHUNK_SIZE, compute_chunks, iter_records, write_csv_chunks, write_json_chunks
+
+    try:
+        if args.sectores:
+            from sectors import calculate_sector_chunks, iter_greenhouse_reports
+
+            # Sectors of a greenhouse may be anywhere in the input, so it is read whole
+            resultado = calculate_sector_chunks(_iter_chunks(args.files, args.chunk_size or DEFAULT_CHUNK_SIZE))
+            chunks = [resultado['invernaderos']]
+            records = iter_greenhouse_reports(resultado)
+        else:
+            chunks = compute_chunks(_iter_chunks(args.files, args.chunk_size or DEFAULT_CHUNK_SIZE))
+            records = iter_records(chunks)
+
+        if args.receta:
+            if args.format not in ('pdf', 'zip'):
+                raise ValueError('--receta solo se aplica a los informes (-f pdf o -f zip)')
+            from recipes import iter_recipe_records, read_recipe, recipe_for_event
+
+            receta = read_recipe(args.receta)
+            if args.sectores:
+                records = ({**record, 'tanques': recipe_for_event(record, receta)} for record in records)
+            else:
+                records = iter_recipe_records(chunks, receta)
+
+        if args.format == 'pdf':
+            from itertools import chain
+
+            from report import generate_farm_report, generate_pdf_report
+
+            first = next(records, None)
+            second = next(records, None)
+            if first is None:
+                raise ValueError('No hay riegos en la entrada')
+            output = _open_output(args.output, binary=True)
+            if second is None:
+                output.write(generate_pdf_report(first))
+                total = 1
+            else:
+                # Several events go into one consolidated report, streamed from the input
+                counted = _count(chain([first, second], records))
+                generate_farm_report(counted, output)
+                total = counted.total
+        elif args.format == 'zip':
+            from export import export_pdf_zip
+
+            output = _open_output(args.output, binary=True)
+            total = export_pdf_zip(records, output, args.workers, _print_progress)
+            if sys.stderr.isatty():
+                print(file=sys.stderr)
+        else:
+            output = _open_output(args.output)
+            writer = write_csv_chunks if args.format == 'csv' else write_json_chunks
+            total = writer(chunks, output)
+    except (OSError, ValueError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+
+    if output not in (sys.stdout, sys.stdout.buffer):
+        output.close()
+    print(f"{total} {'invernaderos' if args.sectores else 'riegos'} calculados", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Parallel export of one PDF report per irrigation event into a ZIP archive.
+
+ReportLab rendering is pure Python and CPU bound, so the reports are spread
+over a process pool and every finished PDF is written to the archive as soon
+as it completes. Only a bounded number of events is in flight at a time, so
+memory stays flat however large the input is.
+"""
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+DEFAULT_WORKERS = int(os.environ.get('ABONO_EXPORT_WORKERS', 0)) or os.cpu_count() or 1
+
+def _render(record):
+    from report import generate_pdf_report
+
+    return generate_pdf_report(record)
+
+def _file_name(numero, usados):
+    """Unique archive name for a greenhouse's report, like the UI's download name"""
+    numero = ''.join(c for c in str(numero) if c.isalnum() or c in '-_') or 'sin_numero'
+    veces = usados.get(numero, 0) + 1
+    usados[numero] = veces
+    sufijo = f'_{veces}' if veces > 1 else ''
+    return f'informe_abono_{numero}{sufijo}.pdf'
+
+def export_pdf_zip(records, output, workers=None, progress=None, max_pending=None):
+    """Write a PDF report per record into a ZIP archive.
+
+    records is an iterable of event dicts as yielded by iter_records(); it is
+    consumed lazily. output is a binary file object (it doesn't need to be
+    seekable). workers sets the size of the process pool (DEFAULT_WORKERS,
+    from ABONO_EXPORT_WORKERS or the CPU count, if not given); with one worker
+    the reports are rendered in this process. At most max_pending reports
+    (twice the workers by default) are rendered or waiting to be written.
+
+    Files are named after their greenhouse in input order, but written in
+    the order they finish. progress, if given, is called with the number of
+    files written after each one. Returns that number.
+    """
+    workers = workers or DEFAULT_WORKERS
+    max_pending = max_pending or 2 * workers
+    # Every report in the archive carries the same date
+    fecha = datetime.now().strftime("%d/%m/%Y %H:%M")
+    usados = {}
+    total = 0
+
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archivo:
+        def guardar(nombre, pdf_bytes):
+            nonlocal total
+            archivo.writestr(nombre, pdf_bytes)
+            total += 1
+            if progress is not None:
+                progress(total)
+
+        if workers == 1:
+            for record in records:
+                guardar(_file_name(record['numero_invernadero'], usados), _render({**record, 'fecha': fecha}))
+            return total
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pendientes = {}
+            for record in records:
+                if len(pendientes) >= max_pending:
+                    hechos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                    for future in hechos:
+                        guardar(pendientes.pop(future), future.result())
+                future = pool.submit(_render, {**record, 'fecha': fecha})
+                pendientes[future] = _file_name(record['numero_invernadero'], usados)
+            while pendientes:
+                hechos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                for future in hechos:
+                    guardar(pendientes.pop(future), future.result())
+    return total
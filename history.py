@@ -0,0 +1,291 @@
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+
+from calculations import OUTPUT_FIELDS
+
+DEFAULT_PATH = os.environ.get('ABONO_HISTORY_DB', 'historial.db')
+
+DEFAULT_PAGE_SIZE = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calculos (
+    id INTEGER PRIMARY KEY,
+    fecha TEXT NOT NULL,
+    numero_invernadero TEXT NOT NULL,
+    superficie REAL NOT NULL,
+    goteros_totales REAL NOT NULL,
+    caudal_gotero REAL NOT NULL,
+    ce_abono REAL NOT NULL,
+    tiempo_riego REAL NOT NULL,
+    goteros_por_metro REAL NOT NULL,
+    litros_agua_hora REAL NOT NULL,
+    caudal_1000m2_hora REAL NOT NULL,
+    agua_gastada_riego REAL NOT NULL,
+    abono_gastado REAL NOT NULL
+);
+-- Both indexes cover the aggregated columns, so totals over a date range
+-- or a greenhouse are answered from the index without touching the table
+CREATE INDEX IF NOT EXISTS idx_calculos_invernadero_fecha
+    ON calculos (numero_invernadero, fecha, agua_gastada_riego, abono_gastado);
+CREATE INDEX IF NOT EXISTS idx_calculos_fecha
+    ON calculos (fecha, numero_invernadero, agua_gastada_riego, abono_gastado);
+"""
+
+# Totals per greenhouse and day / week (weeks start on Monday), kept up to
+# date by a trigger in the same transaction as every insert
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resumen_diario (
+    numero_invernadero TEXT NOT NULL,
+    periodo TEXT NOT NULL,
+    riegos INTEGER NOT NULL,
+    agua_gastada_riego REAL NOT NULL,
+    abono_gastado REAL NOT NULL,
+    PRIMARY KEY (numero_invernadero, periodo)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_resumen_diario_periodo ON resumen_diario (periodo);
+CREATE TABLE IF NOT EXISTS resumen_semanal (
+    numero_invernadero TEXT NOT NULL,
+    periodo TEXT NOT NULL,
+    riegos INTEGER NOT NULL,
+    agua_gastada_riego REAL NOT NULL,
+    abono_gastado REAL NOT NULL,
+    PRIMARY KEY (numero_invernadero, periodo)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_resumen_semanal_periodo ON resumen_semanal (periodo);
+CREATE TRIGGER IF NOT EXISTS calculos_resumen AFTER INSERT ON calculos BEGIN
+    INSERT INTO resumen_diario VALUES
+        (NEW.numero_invernadero, date(NEW.fecha), 1, NEW.agua_gastada_riego, NEW.abono_gastado)
+    ON CONFLICT DO UPDATE SET
+        riegos = riegos + 1,
+        agua_gastada_riego = agua_gastada_riego + excluded.agua_gastada_riego,
+        abono_gastado = abono_gastado + excluded.abono_gastado;
+    INSERT INTO resumen_semanal VALUES
+        (NEW.numero_invernadero, date(NEW.fecha, 'weekday 0', '-6 days'), 1, NEW.agua_gastada_riego, NEW.abono_gastado)
+    ON CONFLICT DO UPDATE SET
+        riegos = riegos + 1,
+        agua_gastada_riego = agua_gastada_riego + excluded.agua_gastada_riego,
+        abono_gastado = abono_gastado + excluded.abono_gastado;
+END;
+"""
+
+# Rebuilds the rollups from the raw history, for databases created before them
+ROLLUP_BACKFILL = """
+DELETE FROM resumen_diario;
+DELETE FROM resumen_semanal;
+INSERT INTO resumen_diario
+    SELECT numero_invernadero, date(fecha), COUNT(*), SUM(agua_gastada_riego), SUM(abono_gastado)
+    FROM calculos GROUP BY 1, 2;
+INSERT INTO resumen_semanal
+    SELECT numero_invernadero, date(fecha, 'weekday 0', '-6 days'), COUNT(*), SUM(agua_gastada_riego), SUM(abono_gastado)
+    FROM calculos GROUP BY 1, 2;
+"""
+
+# Rollup table of each period accepted by HistoryStore.totals()
+ROLLUP_TABLES = {'dia': 'resumen_diario', 'semana': 'resumen_semanal'}
+
+COLUMNS = ('id', 'fecha') + OUTPUT_FIELDS
+
+def _timestamp(value, end=False):
+    """Normalize a date bound to the stored text format.
+
+    A date used as an end bound includes that whole day.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        if '/' not in value:
+            return value
+        # Display format used by the reports, e.g. 17/10/2026 09:30
+        value = datetime.strptime(value, '%d/%m/%Y %H:%M')
+    if not isinstance(value, datetime):
+        if end:
+            value += timedelta(days=1)
+        value = datetime(value.year, value.month, value.day)
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+def _period_start(value, periodo):
+    """Key of the day or week (its Monday) containing a date bound"""
+    if isinstance(value, str):
+        value = datetime.strptime(_timestamp(value)[:10], '%Y-%m-%d')
+    if isinstance(value, datetime):
+        value = value.date()
+    if periodo == 'semana':
+        value -= timedelta(days=value.weekday())
+    return value.isoformat()
+
+class HistoryStore:
+    """Calculation history in an embedded SQLite database.
+
+    Every thread gets its own connection (Streamlit runs each session on its
+    own thread) and the database uses WAL mode so readers don't block the
+    writers recording new calculations. Daily and weekly totals per
+    greenhouse are materialized in rollup tables that a trigger updates on
+    every insert, so totals never re-sum the raw history.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        with conn:
+            conn.executescript(SCHEMA)
+            nuevo = conn.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name = 'calculos_resumen'"
+            ).fetchone()[0] == 0
+            conn.executescript(ROLLUP_SCHEMA)
+            if nuevo:
+                conn.executescript(ROLLUP_BACKFILL)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def record(self, data, fecha=None):
+        """Store a completed calculation"""
+        self.record_many([data], fecha)
+
+    def record_many(self, records, fecha=None):
+        """Store many calculations in one transaction.
+
+        Records may carry their own 'fecha' (a datetime or stored-format
+        text); otherwise they are stamped with fecha or the current time.
+        """
+        default = _timestamp(fecha or datetime.now().replace(microsecond=0))
+        placeholders = ', '.join('?' * (len(OUTPUT_FIELDS) + 1))
+        sql = f"INSERT INTO calculos (fecha, {', '.join(OUTPUT_FIELDS)}) VALUES ({placeholders})"
+        rows = (
+            (
+                _timestamp(data.get('fecha')) or default,
+                str(data.get('numero_invernadero') or ''),
+                *(float(data.get(campo, 0)) for campo in OUTPUT_FIELDS[1:])
+            )
+            for data in records
+        )
+        conn = self._connect()
+        with conn:
+            conn.executemany(sql, rows)
+
+    def _filters(self, numero_invernadero, desde, hasta):
+        conditions, params = [], []
+        if numero_invernadero is not None:
+            conditions.append('numero_invernadero = ?')
+            params.append(str(numero_invernadero))
+        if desde is not None:
+            conditions.append('fecha >= ?')
+            params.append(_timestamp(desde))
+        if hasta is not None:
+            conditions.append('fecha < ?' if isinstance(hasta, date) and not isinstance(hasta, datetime) else 'fecha <= ?')
+            params.append(_timestamp(hasta, end=True))
+        return conditions, params
+
+    def query(self, numero_invernadero=None, desde=None, hasta=None, limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """Return one page of calculations, newest first.
+
+        Uses keyset pagination: pass the returned cursor to get the next
+        page, so deep pages cost the same as the first one. Returns a tuple
+        (rows, next_cursor); next_cursor is None on the last page.
+        """
+        conditions, params = self._filters(numero_invernadero, desde, hasta)
+        if cursor is not None:
+            conditions.append('(fecha, id) < (?, ?)')
+            params.extend(cursor)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        sql = f"SELECT {', '.join(COLUMNS)} FROM calculos {where} ORDER BY fecha DESC, id DESC LIMIT ?"
+        rows = self._connect().execute(sql, (*params, limit + 1)).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1][1], rows[-1][0])
+        return [dict(zip(COLUMNS, row)) for row in rows], next_cursor
+
+    def _rollup_filters(self, periodo, numero_invernadero, desde, hasta):
+        conditions, params = [], []
+        if numero_invernadero is not None:
+            conditions.append('numero_invernadero = ?')
+            params.append(str(numero_invernadero))
+        if desde is not None:
+            conditions.append('periodo >= ?')
+            params.append(_period_start(desde, periodo))
+        if hasta is not None:
+            conditions.append('periodo <= ?')
+            params.append(_period_start(hasta, periodo))
+        return conditions, params
+
+    def totals(self, periodo='dia', desde=None, hasta=None, numero_invernadero=None):
+        """Totals per greenhouse and day or week ('dia' or 'semana'), from the rollups.
+
+        Bounds are dates (datetimes and text are truncated to their day) and
+        select the days or weeks that contain them. Rows are ordered by
+        period, then greenhouse; weeks are keyed by their Monday.
+        """
+        tabla = ROLLUP_TABLES[periodo]
+        conditions, params = self._rollup_filters(periodo, numero_invernadero, desde, hasta)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        sql = f"""
+            SELECT periodo, numero_invernadero, riegos, agua_gastada_riego, abono_gastado
+            FROM {tabla} {where}
+            ORDER BY periodo, numero_invernadero
+        """
+        return [
+            {
+                periodo: clave,
+                'numero_invernadero': numero,
+                'riegos': riegos,
+                'agua_gastada_riego': agua,
+                'abono_gastado': abono
+            }
+            for clave, numero, riegos, agua, abono in self._connect().execute(sql, params)
+        ]
+
+    def aggregate(self, desde=None, hasta=None, numero_invernadero=None):
+        """Per-greenhouse totals of water and fertilizer over a date range.
+
+        Whole-day bounds (dates or None) are answered from the daily
+        rollups; bounds with a time of day scan the raw history.
+        """
+        if any(isinstance(valor, (datetime, str)) for valor in (desde, hasta)):
+            conditions, params = self._filters(numero_invernadero, desde, hasta)
+            tabla = 'calculos'
+            riegos = 'COUNT(*)'
+        else:
+            conditions, params = self._rollup_filters('dia', numero_invernadero, desde, hasta)
+            tabla = 'resumen_diario'
+            riegos = 'SUM(riegos)'
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        sql = f"""
+            SELECT numero_invernadero, {riegos}, SUM(agua_gastada_riego), SUM(abono_gastado)
+            FROM {tabla} {where}
+            GROUP BY numero_invernadero
+            ORDER BY numero_invernadero
+        """
+        return [
+            {
+                'numero_invernadero': numero,
+                'riegos': riegos,
+                'agua_gastada_riego': agua,
+                'abono_gastado': abono
+            }
+            for numero, riegos, agua, abono in self._connect().execute(sql, params)
+        ]
+
+    def count(self):
+        return self._connect().execute('SELECT COUNT(*) FROM calculos').fetchone()[0]
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+def get_history_store():
+    """Process-wide store at ABONO_HISTORY_DB (historial.db by default)"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = HistoryStore()
+        return _default_store
@@ -0,0 +1,292 @@
+"""Local load test of app.py with concurrent virtual sessions.
+
+Every virtual session drives the app through Streamlit's testing interface
+(streamlit.testing.v1.AppTest), the way an operator does in the browser:
+open the page, enter the data of an irrigation, press "Guardar PDF", press
+"Compartir" and press "Reiniciar", as many cycles as asked for.
+
+    python loadtest.py                              # 10 sessions, 5 cycles each
+    python loadtest.py --sesiones 50 --ciclos 20 -o carga.json
+    python loadtest.py --sesiones 20 --pausa 2      # 2 s of "thinking" between steps
+
+Sessions run in threads of one process, which is how a Streamlit server runs
+its sessions, so the results size a single server process. Every step is a
+full script run (what the browser waits for after each click); the report
+has the throughput, latency percentiles per step and overall, and memory per
+session: the growth of the process RSS while the sessions run (after an
+uncounted warm-up cycle) divided by the number of sessions, and with
+--tracemalloc the Python heap peak as well (slower, so the latencies are not
+comparable to runs without it).
+
+Each session enters different data (from --seed), so the PDF cache only
+hits when --datos limits the number of distinct irrigations. Calculations
+are recorded in a temporary history database unless --historial is given.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+STEPS = ('cargar', 'datos', 'pdf', 'compartir', 'reiniciar')
+
+PERCENTILES = (50, 90, 95, 99)
+
+def _rss():
+    """Resident memory of this process in bytes, or None where it can't be read"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak rather than current outside Linux; bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+class _RSSSampler(threading.Thread):
+    """Highest RSS seen while running, sampled every interval seconds"""
+
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.inicial = _rss()
+        self.pico = self.inicial
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        rss = _rss()
+        if rss is not None and (self.pico is None or rss > self.pico):
+            self.pico = rss
+
+    def stop(self):
+        self._parar.set()
+        self.join()
+        self._sample()
+
+def _share_script_cache():
+    """Compile app.py once for every session, as the Streamlit server does.
+
+    AppTest builds a new ScriptCache on each run, so every step would
+    recompile the script (and Python 3.11 can fail compiling in several
+    threads at once); the server keeps one cache for all its sessions.
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: cache
+
+def _quiet_streamlit():
+    """Drop the "missing ScriptRunContext" warning AppTest logs on every run.
+
+    Streamlit resets its log levels once its config is loaded, so this goes
+    after the first run.
+    """
+    import logging
+
+    logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').setLevel(logging.ERROR)
+
+def irrigation_data(rng, numero):
+    """Form values of a random but plausible irrigation"""
+    return {
+        'numero_invernadero': str(numero),
+        'superficie': round(rng.uniform(500, 10000), 0),
+        'goteros_totales': float(rng.randrange(1000, 20000)),
+        'caudal_gotero': round(rng.uniform(1, 8), 1),
+        'ce_abono': round(rng.uniform(0.5, 4), 2),
+        'tiempo_riego': round(rng.uniform(5, 90), 1)
+    }
+
+def _button(at, etiqueta):
+    for boton in at.button:
+        if etiqueta in boton.label:
+            return boton
+    raise LookupError(f'no aparece el botón "{etiqueta}"')
+
+class VirtualSession:
+    """One operator going through the calculator in a loop"""
+
+    def __init__(self, numero, ciclos, datos, pausa, timeout, seed):
+        self.numero = numero
+        self.ciclos = ciclos
+        self.datos = datos
+        self.pausa = pausa
+        self.timeout = timeout
+        self.rng = random.Random(seed * 100003 + numero)
+        self.latencias = {step: [] for step in STEPS}
+        self.completados = 0
+        self.errores = []
+
+    def _step(self, at, step, accion=None):
+        if accion is not None:
+            accion()
+        inicio = time.perf_counter()
+        at.run(timeout=self.timeout)
+        self.latencias[step].append(time.perf_counter() - inicio)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+        if self.pausa:
+            time.sleep(self.rng.uniform(0, 2 * self.pausa))
+
+    def _fill(self, at, valores):
+        for campo, valor in valores.items():
+            if campo == 'numero_invernadero':
+                at.text_input(key=campo).set_value(valor)
+            else:
+                at.number_input(key=campo).set_value(valor)
+
+    def run(self):
+        from streamlit.testing.v1 import AppTest
+
+        at = AppTest.from_file(APP, default_timeout=self.timeout)
+        try:
+            self._step(at, 'cargar')
+        except Exception as e:
+            self.errores.append(f'cargar: {e}')
+            return
+        for _ in range(self.ciclos):
+            step = 'datos'
+            try:
+                if self.datos:
+                    numero = self.rng.randrange(self.datos)
+                    valores = irrigation_data(random.Random(numero), numero)
+                else:
+                    valores = irrigation_data(self.rng, self.numero)
+                self._step(at, step, lambda: self._fill(at, valores))
+                for step, etiqueta in (('pdf', 'Guardar PDF'), ('compartir', 'Compartir'), ('reiniciar', 'Reiniciar')):
+                    self._step(at, step, _button(at, etiqueta).click)
+                self.completados += 1
+            except Exception as e:
+                self.errores.append(f'{step}: {e}')
+                # Start the next cycle from a fresh page, as a reload would
+                at = AppTest.from_file(APP, default_timeout=self.timeout)
+                try:
+                    self._step(at, 'cargar')
+                except Exception as e:
+                    self.errores.append(f'cargar: {e}')
+                    return
+
+def _percentiles(valores):
+    """Nearest-rank percentiles of latencies, in seconds"""
+    if not valores:
+        return {}
+    valores = sorted(valores)
+    resultado = {'n': len(valores), 'media': sum(valores) / len(valores)}
+    for p in PERCENTILES:
+        resultado[f'p{p}'] = valores[min(len(valores) - 1, max(0, -(-p * len(valores) // 100) - 1))]
+    resultado['max'] = valores[-1]
+    return resultado
+
+def run_load(sesiones, ciclos, datos=0, pausa=0.0, timeout=60.0, seed=42, usar_tracemalloc=False):
+    """Run the virtual sessions concurrently and return the report dict"""
+    _share_script_cache()
+    # One uncounted cycle first, so imports and first-use setup (Streamlit,
+    # NumPy, ReportLab, the history database) don't count as session memory
+    VirtualSession(-1, 1, datos, 0.0, timeout, seed).run()
+    _quiet_streamlit()
+
+    virtuales = [VirtualSession(i, ciclos, datos, pausa, timeout, seed) for i in range(sesiones)]
+    hilos = [threading.Thread(target=v.run, name=f'sesion-{v.numero}', daemon=True) for v in virtuales]
+
+    if usar_tracemalloc:
+        tracemalloc.start()
+        heap_inicial = tracemalloc.get_traced_memory()[0]
+    muestreo = _RSSSampler()
+    muestreo.start()
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+    muestreo.stop()
+    if usar_tracemalloc:
+        heap_pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    todas = [t for v in virtuales for step in STEPS for t in v.latencias[step]]
+    completados = sum(v.completados for v in virtuales)
+    errores = [f'sesión {v.numero}: {error}' for v in virtuales for error in v.errores]
+
+    memoria = {'rss_inicial_bytes': muestreo.inicial, 'rss_pico_bytes': muestreo.pico}
+    if muestreo.inicial is not None:
+        memoria['por_sesion_bytes'] = (muestreo.pico - muestreo.inicial) / sesiones
+    if usar_tracemalloc:
+        memoria['heap_pico_por_sesion_bytes'] = (heap_pico - heap_inicial) / sesiones
+
+    return {
+        'sesiones': sesiones,
+        'ciclos': ciclos,
+        'pausa': pausa,
+        'segundos': duracion,
+        'ciclos_completados': completados,
+        'ciclos_por_segundo': completados / duracion,
+        'interacciones_por_segundo': len(todas) / duracion,
+        'latencia': {'total': _percentiles(todas), **{step: _percentiles([t for v in virtuales for t in v.latencias[step]]) for step in STEPS}},
+        'memoria': memoria,
+        'errores': errores
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='loadtest.py',
+        description='Prueba de carga local de la calculadora con sesiones simultáneas'
+    )
+    parser.add_argument('--sesiones', type=int, default=10, help='sesiones simultáneas (por defecto 10)')
+    parser.add_argument('--ciclos', type=int, default=5, help='ciclos datos → PDF → compartir → reiniciar por sesión (por defecto 5)')
+    parser.add_argument('--pausa', type=float, default=0.0, help='segundos medios de espera entre pasos, como un operador (por defecto 0)')
+    parser.add_argument('--datos', type=int, default=0, help='número de riegos distintos a repartir entre las sesiones (por defecto todos distintos)')
+    parser.add_argument('--timeout', type=float, default=60.0, help='segundos máximos de cada paso (por defecto 60)')
+    parser.add_argument('--seed', type=int, default=42, help='semilla de los datos introducidos')
+    parser.add_argument('--historial', help='base de datos del historial (por defecto una temporal)')
+    parser.add_argument('--tracemalloc', action='store_true', help='medir también el heap de Python (más lento)')
+    parser.add_argument('-o', '--output', help='guardar los resultados en este archivo JSON')
+    args = parser.parse_args(argv)
+    if args.sesiones < 1 or args.ciclos < 1:
+        parser.error('--sesiones y --ciclos deben ser al menos 1')
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Before app.py is first run, so the load doesn't fill the real history
+        os.environ['ABONO_HISTORY_DB'] = args.historial or os.path.join(tmp, 'historial.db')
+        print(f'{args.sesiones} sesiones × {args.ciclos} ciclos...', file=sys.stderr)
+        resultados = run_load(
+            args.sesiones, args.ciclos, args.datos, args.pausa, args.timeout, args.seed, args.tracemalloc
+        )
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'results': resultados
+    }
+    salida = json.dumps(report, indent=2, ensure_ascii=False)
+    print(salida)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(salida + '\n')
+
+    if resultados['errores']:
+        print(f"{len(resultados['errores'])} errores, el primero: {resultados['errores'][0]}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Export of precomputed lookup tables for offline use.
+
+For every greenhouse in the registry (see registry.py), water and fertilizer
+are computed over a grid of irrigation times and CE values in a single
+calculate_batch() broadcast and written to a compact binary file that
+lookup_reader.py reads without the server, NumPy or the rest of the app:
+
+    python lookup.py -o tablas.bin
+    python lookup.py -o tablas.bin --tiempo 0 180 19 --ce 0 6 13
+
+Water is linear in the time and fertilizer bilinear in time and CE, so the
+reader interpolates exact values between grid points: the grid only needs
+to cover the range used in the field, not to be fine.
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from calculations import calculate_batch
+from lookup_reader import HEADER, MAGIC
+
+# Default grid: (first, last, points)
+DEFAULT_TIEMPO = (0.0, 240.0, 25)
+DEFAULT_CE = (0.0, 10.0, 21)
+
+def build_tables(registro, tiempo=DEFAULT_TIEMPO, ce=DEFAULT_CE):
+    """Water and fertilizer grids for every greenhouse of a GreenhouseRegistry.
+
+    tiempo and ce are (first, last, points) tuples. Returns a dict with the
+    greenhouse ids, the 'tiempo' and 'ce' axes, 'agua' of shape (G, T) and
+    'abono' of shape (G, C, T), both float32.
+    """
+    if not len(registro):
+        raise ValueError("No hay invernaderos registrados")
+    if int(tiempo[2]) < 1 or int(ce[2]) < 1:
+        raise ValueError("La tabla necesita al menos un punto por eje")
+    if tiempo[0] > tiempo[1] or ce[0] > ce[1]:
+        raise ValueError("El inicio de cada eje no puede ser mayor que el final")
+    if (tiempo[0] == tiempo[1] and int(tiempo[2]) > 1) or (ce[0] == ce[1] and int(ce[2]) > 1):
+        raise ValueError("Un eje con el inicio igual al final solo puede tener un punto")
+    if tiempo[0] < 0 or ce[0] < 0:
+        raise ValueError("El tiempo de riego y la CE de la tabla no pueden ser negativos")
+    tiempos = np.linspace(*tiempo[:2], int(tiempo[2]))
+    ces = np.linspace(*ce[:2], int(ce[2]))
+
+    # One row per id, the one the registry uses when an id is repeated
+    ids = registro.ids()
+    filas = np.fromiter((registro.index[numero] for numero in ids), dtype=np.intp, count=len(ids))
+    columnas = {campo: registro.columns[campo][filas] for campo in ('superficie', 'goteros_totales', 'caudal_gotero', 'litros_agua_hora')}
+
+    por_invernadero = (slice(None), np.newaxis, np.newaxis)
+    resultados = calculate_batch(
+        columnas['superficie'][por_invernadero],
+        columnas['goteros_totales'][por_invernadero],
+        columnas['caudal_gotero'][por_invernadero],
+        ces[np.newaxis, :, np.newaxis],
+        tiempos[np.newaxis, np.newaxis, :]
+    )
+    return {
+        'ids': ids,
+        'tiempo': tiempos,
+        'ce': ces,
+        # Water doesn't depend on the CE, so it has one row per greenhouse
+        'agua': np.ascontiguousarray(columnas['litros_agua_hora'][:, np.newaxis] / 60 * tiempos, dtype='<f4'),
+        'abono': np.ascontiguousarray(resultados['abono_gastado'], dtype='<f4')
+    }
+
+def write_tables(tablas, output):
+    """Write build_tables() output to a binary file object in the lookup_reader.py layout"""
+    ids = '\n'.join(tablas['ids']).encode('utf-8')
+    G, C, T = tablas['abono'].shape
+    output.write(MAGIC)
+    output.write(HEADER.pack(
+        G, T, C,
+        float(tablas['tiempo'][0]), float(tablas['tiempo'][-1]),
+        float(tablas['ce'][0]), float(tablas['ce'][-1]),
+        len(ids)
+    ))
+    output.write(ids + b'\0' * (-len(ids) % 8))
+    output.write(tablas['agua'].tobytes())
+    output.write(tablas['abono'].tobytes())
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='lookup.py',
+        description='Tablas de agua y abono por invernadero para consultar sin conexión'
+    )
+    parser.add_argument('-o', '--output', required=True, help='archivo de tablas a generar')
+    parser.add_argument(
+        '--registro',
+        help='archivo de invernaderos (por defecto ABONO_INVERNADEROS o invernaderos.csv)'
+    )
+    parser.add_argument(
+        '--tiempo', nargs=3, type=float, default=DEFAULT_TIEMPO, metavar=('INICIO', 'FIN', 'PUNTOS'),
+        help='minutos de riego de la tabla (por defecto 0 240 25)'
+    )
+    parser.add_argument(
+        '--ce', nargs=3, type=float, default=DEFAULT_CE, metavar=('INICIO', 'FIN', 'PUNTOS'),
+        help='CE del abono de la tabla (por defecto 0 10 21)'
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    from registry import GreenhouseRegistry, get_registry
+
+    try:
+        registro = GreenhouseRegistry.from_file(args.registro) if args.registro else get_registry()
+        tablas = build_tables(registro, args.tiempo, args.ce)
+        with open(args.output, 'wb') as output:
+            write_tables(tablas, output)
+    except (OSError, ValueError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+
+    G, C, T = tablas['abono'].shape
+    print(f'{G} invernaderos, {T} tiempos × {C} CE', file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
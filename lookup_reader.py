@@ -0,0 +1,123 @@
+"""Standalone reader of the lookup tables written by lookup.py.
+
+Only needs the standard library, so it can be copied on its own to a field
+tablet together with the tables file:
+
+    python lookup_reader.py tablas.bin 7 30 1.5    # greenhouse, minutes, CE
+
+The file is memory-mapped and each lookup reads just the grid cells around
+the requested time and CE. Water is linear in the time and fertilizer is
+bilinear in time and CE, so interpolating between grid points gives the
+same results as the calculator (to float32 precision) anywhere inside the
+grid.
+
+File layout (little-endian): the MAGIC bytes, a HEADER with the number of
+greenhouses G, time points T and CE points C, the first and last time and
+CE of the grid and the size of the id block; the greenhouse ids as UTF-8
+separated by newlines, padded to 8 bytes; then float32 water per greenhouse
+and time (G, T) and fertilizer per greenhouse, CE and time (G, C, T).
+"""
+import mmap
+import struct
+import sys
+
+MAGIC = b'ABONOLT1'
+HEADER = struct.Struct('<3I4dI')
+
+class LookupTables:
+    """Memory-mapped water and fertilizer tables per greenhouse"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} no es un archivo de tablas de abono")
+        (self.invernaderos, self.puntos_tiempo, self.puntos_ce,
+         self.tiempo_min, self.tiempo_max, self.ce_min, self.ce_max, largo_ids) = HEADER.unpack_from(self._mmap, len(MAGIC))
+        inicio = len(MAGIC) + HEADER.size
+        ids = self._mmap[inicio:inicio + largo_ids].decode('utf-8').split('\n') if largo_ids else []
+        self._filas = {numero: fila for fila, numero in enumerate(ids)}
+        self._agua = inicio + (largo_ids + 7) // 8 * 8
+        self._abono = self._agua + 4 * self.invernaderos * self.puntos_tiempo
+        fin = self._abono + 4 * self.invernaderos * self.puntos_ce * self.puntos_tiempo
+        # Every greenhouse needs exactly one id and one row of each table
+        if len(self._filas) != len(ids) or len(ids) != self.invernaderos or len(self._mmap) < fin:
+            self._mmap.close()
+            raise ValueError(f"{path} está dañado: los invernaderos no coinciden con las tablas")
+        # Interpolation needs axes with distinct ends whenever they have several points
+        for puntos, minimo, maximo in ((self.puntos_tiempo, self.tiempo_min, self.tiempo_max), (self.puntos_ce, self.ce_min, self.ce_max)):
+            if puntos < 1 or (puntos > 1 and not minimo < maximo):
+                self._mmap.close()
+                raise ValueError(f"{path} está dañado: los ejes de la tabla no son válidos")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._mmap.close()
+
+    def ids(self):
+        return list(self._filas)
+
+    def _float(self, offset):
+        return struct.unpack_from('<f', self._mmap, offset)[0]
+
+    @staticmethod
+    def _position(valor, minimo, maximo, puntos):
+        """Grid index below valor and the fraction towards the next point"""
+        if not minimo <= valor <= maximo:
+            raise ValueError(f"{valor} está fuera del rango de la tabla ({minimo} a {maximo})")
+        if puntos == 1:
+            return 0, 0.0
+        posicion = (valor - minimo) / (maximo - minimo) * (puntos - 1)
+        indice = min(int(posicion), puntos - 2)
+        return indice, posicion - indice
+
+    def lookup(self, numero_invernadero, tiempo_riego, ce_abono):
+        """Water (L) and fertilizer (Kg) of one irrigation, as (agua, abono)"""
+        fila = self._filas.get(str(numero_invernadero))
+        if fila is None:
+            raise KeyError(numero_invernadero)
+        T = self.puntos_tiempo
+        t, ft = self._position(tiempo_riego, self.tiempo_min, self.tiempo_max, T)
+        c, fc = self._position(ce_abono, self.ce_min, self.ce_max, self.puntos_ce)
+        t2 = min(t + 1, T - 1)
+        c2 = min(c + 1, self.puntos_ce - 1)
+
+        base = self._agua + 4 * fila * T
+        agua = self._float(base + 4 * t) * (1 - ft) + self._float(base + 4 * t2) * ft
+
+        base = self._abono + 4 * fila * self.puntos_ce * T
+        def celda(ci, ti):
+            return self._float(base + 4 * (ci * T + ti))
+        abono = (
+            (celda(c, t) * (1 - ft) + celda(c, t2) * ft) * (1 - fc)
+            + (celda(c2, t) * (1 - ft) + celda(c2, t2) * ft) * fc
+        )
+        return agua, abono
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 4:
+        print('Uso: python lookup_reader.py TABLAS INVERNADERO MINUTOS CE', file=sys.stderr)
+        return 2
+    ruta, numero, tiempo, ce = argv
+    try:
+        with LookupTables(ruta) as tablas:
+            agua, abono = tablas.lookup(numero, float(tiempo.replace(',', '.')), float(ce.replace(',', '.')))
+    except KeyError:
+        print(f'Error: el invernadero {numero} no está en las tablas', file=sys.stderr)
+        return 1
+    except (OSError, ValueError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+    print(f'Agua gastada: {agua:.2f} L')
+    print(f'Abono gastado: {abono:.2f} Kg')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Opt-in timing of the expensive stages of the app.
+
+Enabled when ABONO_METRICS=1 or ABONO_METRICS_LOG is set; otherwise timed()
+is a shared no-op context manager. When enabled, every stage keeps a
+count, a total and a latency histogram that can be read as Prometheus text
+(prometheus_text(), or over HTTP with start_metrics_server()), and each
+timing is appended as a JSON line to ABONO_METRICS_LOG if given.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LOG_PATH = os.environ.get('ABONO_METRICS_LOG') or None
+
+# /metrics has no authentication, so it only listens locally unless told otherwise
+HOST = os.environ.get('ABONO_METRICS_HOST', '127.0.0.1')
+
+ENABLED = os.environ.get('ABONO_METRICS', '') not in ('', '0') or LOG_PATH is not None
+
+# Histogram upper bounds in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_NOOP = nullcontext()
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_stages = {}
+_log_file = None
+
+class _Stage:
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+def record(stage, seconds, session=None):
+    """Add one timing of stage to the process totals and, if given, a session dict"""
+    global _log_file
+    with _lock:
+        stats = _stages.get(stage)
+        if stats is None:
+            stats = _stages[stage] = _Stage()
+        stats.count += 1
+        stats.total += seconds
+        stats.max = max(stats.max, seconds)
+        for i, limite in enumerate(BUCKETS):
+            if seconds <= limite:
+                stats.buckets[i] += 1
+
+        if LOG_PATH:
+            if _log_file is None:
+                _log_file = open(LOG_PATH, 'a', encoding='utf-8', buffering=1)
+            _log_file.write(json.dumps({'ts': time.time(), 'stage': stage, 'seconds': seconds}) + '\n')
+
+    if session is not None:
+        # [count, total, max] per stage for the per-session panel
+        entrada = session.setdefault(stage, [0, 0.0, 0.0])
+        entrada[0] += 1
+        entrada[1] += seconds
+        entrada[2] = max(entrada[2], seconds)
+
+@contextmanager
+def _timer(stage, session):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - inicio, session)
+
+def timed(stage, session=None):
+    """Context manager timing a block as stage; free when metrics are disabled"""
+    if not ENABLED:
+        return _NOOP
+    return _timer(stage, session)
+
+def snapshot():
+    """Current totals per stage as plain dicts"""
+    with _lock:
+        return {
+            stage: {
+                'count': stats.count,
+                'total_seconds': stats.total,
+                'max_seconds': stats.max,
+                'buckets': dict(zip(BUCKETS, stats.buckets))
+            }
+            for stage, stats in _stages.items()
+        }
+
+def prometheus_text():
+    """Totals in the Prometheus text exposition format"""
+    lineas = [
+        '# HELP abono_stage_seconds Duration of the instrumented stages',
+        '# TYPE abono_stage_seconds histogram'
+    ]
+    for stage, stats in sorted(snapshot().items()):
+        for limite, cuenta in stats['buckets'].items():
+            lineas.append(f'abono_stage_seconds_bucket{{stage="{stage}",le="{limite}"}} {cuenta}')
+        lineas.append(f'abono_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {stats["count"]}')
+        lineas.append(f'abono_stage_seconds_sum{{stage="{stage}"}} {stats["total_seconds"]}')
+        lineas.append(f'abono_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+    return '\n'.join(lineas) + '\n'
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip('/') != '/metrics':
+            self.send_error(404)
+            return
+        body = prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_server = None
+
+def start_metrics_server(port=None, host=None):
+    """Serve /metrics on a background thread, once per process.
+
+    The port comes from ABONO_METRICS_PORT and the host from
+    ABONO_METRICS_HOST (127.0.0.1 by default) when not given; nothing is
+    started if there is no port or metrics are disabled. If the port can't
+    be bound (another process of the app already serves it) the error is
+    logged and None is returned, so the app keeps working.
+    """
+    global _server
+    port = port or os.environ.get('ABONO_METRICS_PORT')
+    if not ENABLED or not port:
+        return None
+    host = host or HOST
+    with _lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            except OSError as e:
+                logger.warning("No se pudo publicar /metrics en %s:%s: %s", host, port, e)
+                return None
+            threading.Thread(target=_server.serve_forever, name='metrics', daemon=True).start()
+        return _server
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from calculations import OUTPUT_FIELDS
+from metrics import timed
+
+DEFAULT_MAX_BYTES = int(os.environ.get('ABONO_PDF_CACHE_MB', '64')) * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = int(os.environ.get('ABONO_PDF_CACHE_DISK_MB', '512')) * 1024 * 1024
+
+# Pruning the disk tier goes down to this fraction of its budget, so it
+# doesn't rescan the directory on every write once full
+DISK_PRUNE_RATIO = 0.9
+
+# Fields that change the rendered report; the date is printed in the PDF too
+REPORT_FIELDS = OUTPUT_FIELDS + ('fecha',)
+
+def cache_key(data):
+    """Content address of a report: SHA-256 of the fields it renders"""
+    contenido = {campo: data.get(campo) for campo in REPORT_FIELDS}
+    # Optional tables are only keyed when present, so plain reports keep their keys
+    for campo in ('sectores', 'tanques'):
+        if data.get(campo):
+            contenido[campo] = data[campo]
+    payload = json.dumps(contenido, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class PdfCache:
+    """Thread-safe LRU cache of rendered PDF bytes with an optional disk tier.
+
+    The memory tier is bounded by the total size of the cached PDFs. When a
+    directory is given, every rendered PDF is also written there and looked
+    up on a memory miss, so the cache survives restarts and is shared
+    between server processes. The directory is bounded by max_disk_bytes:
+    past it, the least recently used files (by modification time, refreshed
+    on every disk hit) are deleted. Concurrent requests for the same report
+    wait for a single render instead of building it several times.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, directory=None, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._disk_size = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._disk_size = sum(size for _, _, size in self._disk_files())
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        return self._size
+
+    def get(self, key):
+        """Return the cached PDF for key, or None"""
+        with self._lock:
+            pdf_bytes = self._entries.get(key)
+            if pdf_bytes is not None:
+                self._entries.move_to_end(key)
+                return pdf_bytes
+
+        pdf_bytes = self._read_disk(key)
+        if pdf_bytes is not None:
+            self._store(key, pdf_bytes)
+        return pdf_bytes
+
+    def put(self, key, pdf_bytes):
+        """Add a rendered PDF to both tiers"""
+        self._store(key, pdf_bytes)
+        self._write_disk(key, pdf_bytes)
+
+    def get_or_render(self, data, render):
+        """Return the PDF for data, calling render(data) only on a cache miss"""
+        key = cache_key(data)
+        while True:
+            pdf_bytes = self.get(key)
+            if pdf_bytes is not None:
+                self.hits += 1
+                return pdf_bytes
+
+            with self._lock:
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    break
+            # Another thread is rendering the same report
+            pending.wait()
+
+        try:
+            self.misses += 1
+            with timed('pdf_render'):
+                pdf_bytes = render(data)
+            self.put(key, pdf_bytes)
+            return pdf_bytes
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _store(self, key, pdf_bytes):
+        if len(pdf_bytes) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = pdf_bytes
+            self._size += len(pdf_bytes)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                pdf_bytes = f.read()
+            # Mark it as recently used for the pruning
+            os.utime(path)
+        except OSError:
+            return None
+        return pdf_bytes
+
+    def _write_disk(self, key, pdf_bytes):
+        if not self.directory:
+            return
+        # Write to a temporary file first so readers never see a partial PDF
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(pdf_bytes)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with self._lock:
+            self._disk_size += len(pdf_bytes)
+            if self._disk_size <= self.max_disk_bytes:
+                return
+        self._prune_disk()
+
+    def _disk_files(self):
+        """(mtime, path, size) of the cached PDFs in the directory"""
+        archivos = []
+        with os.scandir(self.directory) as entradas:
+            for entrada in entradas:
+                if entrada.name.endswith('.pdf'):
+                    try:
+                        info = entrada.stat()
+                    except OSError:
+                        continue
+                    archivos.append((info.st_mtime, entrada.path, info.st_size))
+        return archivos
+
+    def _prune_disk(self):
+        """Delete the least recently used files until the directory is under budget"""
+        archivos = sorted(self._disk_files())
+        total = sum(size for _, _, size in archivos)
+        objetivo = self.max_disk_bytes * DISK_PRUNE_RATIO
+        for _, path, size in archivos:
+            if total <= objetivo:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # Already pruned by another process
+                pass
+            total -= size
+        with self._lock:
+            self._disk_size = total
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_pdf_cache():
+    """Process-wide cache, configured with ABONO_PDF_CACHE_MB, ABONO_PDF_CACHE_DIR and ABONO_PDF_CACHE_DISK_MB"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PdfCache(directory=os.environ.get('ABONO_PDF_CACHE_DIR') or None)
+        return _default_cache
+
+def cached_pdf_report(data):
+    """generate_pdf_report() through the process-wide cache.
+
+    Reports without a date get today's date, with no time, before looking
+    up the cache: a hit always returns a PDF with the date it would have
+    been rendered with, and the same report is reused all day rather than
+    only within the same minute.
+    """
+    from report import generate_pdf_report
+
+    if not data.get('fecha'):
+        data = {**data, 'fecha': datetime.now().strftime("%d/%m/%Y")}
+    return get_pdf_cache().get_or_render(data, generate_pdf_report)
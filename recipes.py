@@ -0,0 +1,121 @@
+"""Fertilizer recipes injected from several stock tanks.
+
+A recipe is a list of tanks, each a dict with the TANK_FIELDS (or a tuple in
+that order):
+
+- tanque: name of the tank (A, B, Ácido...)
+- reparto: share of abono_gastado injected from this tank; the shares of
+  the tanks that use one must add up to 1
+- concentracion: kg of fertilizer per liter of stock solution
+- proporcion: for tanks on a fixed-ratio injector (usually the acid), the N
+  of a 1:N injection ratio; these are dosed by water volume instead of by
+  share of abono_gastado, so their reparto must be 0
+
+calculate_recipe() solves every tank for every event in one broadcast, from
+the water and fertilizer already computed by calculate_batch().
+"""
+import numpy as np
+
+TANK_FIELDS = ('tanque', 'reparto', 'concentracion', 'proporcion')
+
+# Per-tank results of an irrigation event, as attached to reports under 'tanques'
+TANK_RESULT_FIELDS = ('kg', 'litros', 'caudal_inyeccion', 'proporcion')
+
+def build_recipe(tanques):
+    """Validate a recipe into a dict of per-tank arrays"""
+    tanques = [dict(zip(TANK_FIELDS, t)) if not isinstance(t, dict) else t for t in tanques]
+    if not tanques:
+        raise ValueError("La receta necesita al menos un tanque")
+    receta = {'tanque': [str(t.get('tanque') or f"Tanque {i}") for i, t in enumerate(tanques, 1)]}
+    for campo in TANK_FIELDS[1:]:
+        receta[campo] = np.array([float(t.get(campo) or 0) for t in tanques], dtype=np.float64)
+
+    if (receta['concentracion'] <= 0).any():
+        raise ValueError("La concentración de cada tanque debe ser mayor que cero")
+    if ((receta['reparto'] < 0) | (receta['proporcion'] < 0)).any():
+        raise ValueError("El reparto y la proporción no pueden ser negativos")
+    if ((receta['reparto'] > 0) & (receta['proporcion'] > 0)).any():
+        raise ValueError("Un tanque usa reparto del abono o proporción fija, no ambos")
+    if ((receta['reparto'] == 0) & (receta['proporcion'] == 0)).any():
+        raise ValueError("Cada tanque necesita un reparto del abono o una proporción fija")
+    if (receta['reparto'] > 0).any() and abs(receta['reparto'].sum() - 1) > 1e-6:
+        raise ValueError("El reparto de los tanques debe sumar 1")
+    return receta
+
+def calculate_recipe(agua_gastada_riego, abono_gastado, tiempo_riego, receta):
+    """Injection of every tank for irrigation events.
+
+    agua_gastada_riego, abono_gastado and tiempo_riego are arrays of any
+    (broadcastable) shape S, usually the results of calculate_batch();
+    receta comes from build_recipe(). Returns arrays of shape S + (T,) for
+    T tanks:
+
+    - 'kg': fertilizer injected from the tank
+    - 'litros': stock solution used
+    - 'caudal_inyeccion': injection flow during the irrigation, in L/h
+    - 'proporcion': the N of the resulting 1:N injection ratio (0 if none)
+    """
+    agua, abono, tiempo = np.broadcast_arrays(
+        *(np.asarray(v, dtype=np.float64) for v in (agua_gastada_riego, abono_gastado, tiempo_riego))
+    )
+    agua = agua[..., np.newaxis]
+    abono = abono[..., np.newaxis]
+    tiempo = tiempo[..., np.newaxis]
+    fija = receta['proporcion'] > 0
+
+    litros_fijos = np.zeros(np.broadcast_shapes(agua.shape, fija.shape))
+    np.divide(agua, receta['proporcion'], out=litros_fijos, where=fija)
+    kg = np.where(fija, litros_fijos * receta['concentracion'], abono * receta['reparto'])
+    litros = np.where(fija, litros_fijos, kg / receta['concentracion'])
+
+    caudal_inyeccion = np.zeros(litros.shape)
+    np.divide(litros, tiempo / 60, out=caudal_inyeccion, where=(tiempo > 0) & (litros > 0))
+    proporcion = np.zeros(litros.shape)
+    np.divide(agua, litros, out=proporcion, where=litros > 0)
+
+    return {'kg': kg, 'litros': litros, 'caudal_inyeccion': caudal_inyeccion, 'proporcion': proporcion}
+
+def _tank_rows(receta, resultado):
+    valores = {campo: resultado[campo].tolist() for campo in TANK_RESULT_FIELDS}
+    return [
+        {'tanque': nombre, **{campo: valores[campo][i] for campo in TANK_RESULT_FIELDS}}
+        for i, nombre in enumerate(receta['tanque'])
+    ]
+
+def recipe_for_event(data, receta):
+    """Per-tank rows of one calculation, to attach to it as 'tanques'"""
+    resultado = calculate_recipe(data.get('agua_gastada_riego', 0), data['abono_gastado'], data['tiempo_riego'], receta)
+    return _tank_rows(receta, resultado)
+
+def iter_recipe_records(chunks, receta):
+    """Yield report dicts with 'tanques' for every event of computed chunks.
+
+    The recipe is solved once per chunk for all its events; see
+    batch.compute_chunks() and batch.iter_records().
+    """
+    from batch import iter_records
+
+    for chunk in chunks:
+        resultado = calculate_recipe(chunk['agua_gastada_riego'], chunk['abono_gastado'], chunk['tiempo_riego'], receta)
+        valores = {campo: resultado[campo].tolist() for campo in TANK_RESULT_FIELDS}
+        for fila, record in enumerate(iter_records([chunk])):
+            tanques = [
+                {'tanque': nombre, **{campo: valores[campo][fila][i] for campo in TANK_RESULT_FIELDS}}
+                for i, nombre in enumerate(receta['tanque'])
+            ]
+            yield {**record, 'tanques': tanques}
+
+def read_recipe(path):
+    """Load a recipe from a CSV file with the TANK_FIELDS columns (',' or ';' separated)"""
+    import csv
+
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        header = f.readline()
+        delimiter = ';' if header.count(';') > header.count(',') else ','
+        f.seek(0)
+        filas = list(csv.DictReader(f, delimiter=delimiter))
+    for fila in filas:
+        for campo in TANK_FIELDS[1:]:
+            valor = (fila.get(campo) or '').strip()
+            fila[campo] = float(valor.replace(',', '.') if delimiter == ';' else valor) if valor else 0.0
+    return build_recipe(filas)
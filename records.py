@@ -0,0 +1,107 @@
+"""Compact record types for calculations.
+
+Calculation holds one irrigation event with its results in __slots__ and
+reads like a dict, so it can be passed anywhere a calculation dict was
+(generate_pdf_report, generate_share_text, the PDF cache, the history
+store). CalculationColumns holds many of them column by column, in the same
+layout as the chunks in batch.py, so a whole season of events can go to
+NumPy, the writers or the reports without a per-event dict.
+"""
+from collections.abc import Mapping
+
+from calculations import OUTPUT_FIELDS
+
+class Calculation(Mapping):
+    """One calculation: the fields in OUTPUT_FIELDS, read-only by key"""
+
+    __slots__ = OUTPUT_FIELDS
+
+    def __init__(self, numero_invernadero, superficie, goteros_totales, caudal_gotero, ce_abono, tiempo_riego,
+                 goteros_por_metro, litros_agua_hora, caudal_1000m2_hora, agua_gastada_riego, abono_gastado):
+        self.numero_invernadero = numero_invernadero
+        self.superficie = superficie
+        self.goteros_totales = goteros_totales
+        self.caudal_gotero = caudal_gotero
+        self.ce_abono = ce_abono
+        self.tiempo_riego = tiempo_riego
+        self.goteros_por_metro = goteros_por_metro
+        self.litros_agua_hora = litros_agua_hora
+        self.caudal_1000m2_hora = caudal_1000m2_hora
+        self.agua_gastada_riego = agua_gastada_riego
+        self.abono_gastado = abono_gastado
+
+    def __getitem__(self, campo):
+        if campo not in OUTPUT_FIELDS:
+            raise KeyError(campo)
+        return getattr(self, campo)
+
+    def __iter__(self):
+        return iter(OUTPUT_FIELDS)
+
+    def __len__(self):
+        return len(OUTPUT_FIELDS)
+
+    def __repr__(self):
+        return f"Calculation({', '.join(f'{campo}={getattr(self, campo)!r}' for campo in OUTPUT_FIELDS)})"
+
+    def __reduce__(self):
+        return (Calculation, tuple(getattr(self, campo) for campo in OUTPUT_FIELDS))
+
+class CalculationColumns:
+    """Many calculations stored by column.
+
+    columns maps every field in OUTPUT_FIELDS to a column: a list of str for
+    numero_invernadero and a float64 NumPy array for the rest, as produced by
+    batch.compute_chunk(). column() returns those arrays without copying and
+    the instance can be passed to batch's writers as a single chunk with
+    [table.columns]. Iterating yields a Calculation per event.
+    """
+
+    __slots__ = ('columns',)
+
+    def __init__(self, columns):
+        faltan = [campo for campo in OUTPUT_FIELDS if campo not in columns]
+        if faltan:
+            raise ValueError(f"Faltan columnas: {', '.join(faltan)}")
+        self.columns = {campo: columns[campo] for campo in OUTPUT_FIELDS}
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Concatenate computed chunks (see batch.compute_chunks()) into one table"""
+        import numpy as np
+
+        chunks = list(chunks)
+        columns = {'numero_invernadero': [numero for chunk in chunks for numero in chunk['numero_invernadero']]}
+        for campo in OUTPUT_FIELDS[1:]:
+            columns[campo] = np.concatenate([chunk[campo] for chunk in chunks]) if chunks else np.empty(0)
+        return cls(columns)
+
+    @classmethod
+    def from_records(cls, records):
+        """Build a table from calculation mappings (Calculation or dicts)"""
+        import numpy as np
+
+        records = list(records)
+        columns = {'numero_invernadero': [str(record.get('numero_invernadero') or '') for record in records]}
+        for campo in OUTPUT_FIELDS[1:]:
+            columns[campo] = np.fromiter((record[campo] for record in records), dtype=np.float64, count=len(records))
+        return cls(columns)
+
+    def __len__(self):
+        return len(self.columns['numero_invernadero'])
+
+    def __iter__(self):
+        from batch import iter_records
+
+        return iter_records([self.columns])
+
+    def __getitem__(self, fila):
+        valores = [self.columns['numero_invernadero'][fila]]
+        valores += [float(self.columns[campo][fila]) for campo in OUTPUT_FIELDS[1:]]
+        if valores[2].is_integer():
+            valores[2] = int(valores[2])
+        return Calculation(*valores)
+
+    def column(self, campo):
+        """One column as stored (a NumPy array for the numeric fields), not a copy"""
+        return self.columns[campo]
@@ -0,0 +1,163 @@
+import os
+import threading
+
+from calculations import calculate_batch
+
+DEFAULT_PATH = os.environ.get('ABONO_INVERNADEROS', 'invernaderos.csv')
+
+# Columns of a registry file: greenhouse id and its static values
+REGISTRY_FIELDS = ('numero_invernadero', 'superficie', 'goteros_totales', 'caudal_gotero')
+
+# Results that only depend on the static values, precomputed on load
+STATIC_RESULT_FIELDS = ('goteros_por_metro', 'litros_agua_hora', 'caudal_1000m2_hora')
+
+class GreenhouseRegistry:
+    """Static greenhouse values with their precomputed derived results.
+
+    Values are kept as NumPy columns with a dict index from greenhouse id to
+    row, so lookups are O(1) and whole batches of events can be computed
+    with fancy indexing. Only the time- and CE-dependent results are left
+    to compute for each event.
+    """
+
+    def __init__(self, numeros, superficie, goteros_totales, caudal_gotero):
+        import numpy as np
+
+        self.numeros = list(numeros)
+        self.columns = {
+            'superficie': np.asarray(superficie, dtype=np.float64),
+            'goteros_totales': np.asarray(goteros_totales, dtype=np.float64),
+            'caudal_gotero': np.asarray(caudal_gotero, dtype=np.float64)
+        }
+        derivados = calculate_batch(
+            self.columns['superficie'], self.columns['goteros_totales'], self.columns['caudal_gotero'], 0, 0
+        )
+        for campo in STATIC_RESULT_FIELDS + ('valido',):
+            self.columns[campo] = derivados[campo]
+        # Later rows win when an id appears twice in the file
+        self.index = {numero: fila for fila, numero in enumerate(self.numeros)}
+
+    @classmethod
+    def from_file(cls, path):
+        """Load a CSV or Parquet file with the REGISTRY_FIELDS columns"""
+        import numpy as np
+
+        from batch import read_event_chunks
+
+        with open(path, 'rb') as source:
+            chunks = list(read_event_chunks(source, path, fields=REGISTRY_FIELDS))
+        if not chunks:
+            return cls([], [], [], [])
+        return cls(
+            [numero for chunk in chunks for numero in chunk['numero_invernadero']],
+            *(np.concatenate([chunk[campo] for chunk in chunks]) for campo in REGISTRY_FIELDS[1:])
+        )
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, numero):
+        return numero in self.index
+
+    def ids(self):
+        """Registered greenhouse ids, in file order"""
+        return list(self.index)
+
+    def get(self, numero):
+        """Static and precomputed values of one greenhouse, or None"""
+        fila = self.index.get(numero)
+        if fila is None:
+            return None
+        datos = {'numero_invernadero': numero}
+        for campo in REGISTRY_FIELDS[1:] + STATIC_RESULT_FIELDS:
+            datos[campo] = float(self.columns[campo][fila])
+        if datos['goteros_totales'].is_integer():
+            datos['goteros_totales'] = int(datos['goteros_totales'])
+        return datos
+
+    def calculate_events(self, numeros, ce_abono, tiempo_riego):
+        """Results for irrigation events of registered greenhouses.
+
+        numeros is a sequence of greenhouse ids (KeyError if one isn't
+        registered); ce_abono and tiempo_riego are scalars or arrays of the
+        same length. Returns the same dict as calculate_batch(), reusing the
+        precomputed static results.
+        """
+        import numpy as np
+
+        filas = np.fromiter((self.index[numero] for numero in numeros), dtype=np.intp)
+        ce_abono = np.broadcast_to(np.asarray(ce_abono, dtype=np.float64), filas.shape)
+        tiempo_riego = np.broadcast_to(np.asarray(tiempo_riego, dtype=np.float64), filas.shape)
+
+        superficie = self.columns['superficie'][filas]
+        litros_agua_hora = self.columns['litros_agua_hora'][filas]
+        caudal_1000m2_hora = self.columns['caudal_1000m2_hora'][filas]
+        valido = self.columns['valido'][filas]
+        con_riego = valido & (tiempo_riego > 0)
+        con_abono = con_riego & (ce_abono > 0)
+
+        agua_gastada_riego = np.zeros(filas.shape)
+        abono_gastado = np.zeros(filas.shape)
+        np.multiply(litros_agua_hora / 60, tiempo_riego, out=agua_gastada_riego, where=con_riego)
+        np.multiply(
+            (caudal_1000m2_hora / 100000) * ce_abono * tiempo_riego,
+            superficie / 1000,
+            out=abono_gastado,
+            where=con_abono
+        )
+
+        return {
+            'goteros_por_metro': self.columns['goteros_por_metro'][filas],
+            'litros_agua_hora': litros_agua_hora,
+            'caudal_1000m2_hora': caudal_1000m2_hora,
+            'agua_gastada_riego': agua_gastada_riego,
+            'abono_gastado': abono_gastado,
+            'valido': valido
+        }
+
+    def calculate_event(self, numero, ce_abono, tiempo_riego):
+        """Results of one irrigation event, like calculate(), in plain Python"""
+        datos = self.get(numero)
+        if datos is None:
+            raise KeyError(numero)
+        agua_gastada_riego = 0
+        abono_gastado = 0
+        if self.columns['valido'][self.index[numero]] and tiempo_riego > 0:
+            agua_gastada_riego = (datos['litros_agua_hora'] / 60) * tiempo_riego
+            if ce_abono > 0:
+                abono_gastado = (datos['caudal_1000m2_hora'] / 100000) * ce_abono * tiempo_riego * (datos['superficie'] / 1000)
+        return {
+            'goteros_por_metro': datos['goteros_por_metro'],
+            'litros_agua_hora': datos['litros_agua_hora'],
+            'caudal_1000m2_hora': datos['caudal_1000m2_hora'],
+            'agua_gastada_riego': agua_gastada_riego,
+            'abono_gastado': abono_gastado
+        }
+
+class _EmptyRegistry(GreenhouseRegistry):
+    """Registry without greenhouses that doesn't need NumPy"""
+
+    def __init__(self):
+        self.numeros = []
+        self.columns = {}
+        self.index = {}
+
+    def calculate_events(self, numeros, ce_abono, tiempo_riego):
+        return GreenhouseRegistry([], [], [], []).calculate_events(numeros, ce_abono, tiempo_riego)
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+def get_registry():
+    """Registry loaded once per process from ABONO_INVERNADEROS (invernaderos.csv by default).
+
+    Empty when the file doesn't exist, in which case NumPy isn't loaded.
+    """
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            if os.path.exists(DEFAULT_PATH):
+                _default_registry = GreenhouseRegistry.from_file(DEFAULT_PATH)
+            else:
+                _default_registry = _EmptyRegistry()
+        return _default_registry
@@ -0,0 +1,361 @@
+import io
+from datetime import datetime
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib import colors
+
+@lru_cache(maxsize=None)
+def _pdf_styles():
+    """Paragraph and table styles of the reports, built once per process.
+
+    ReportLab only reads these when laying out a document, so the same
+    objects are shared by every report and every session.
+    """
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceAfter=30,
+        alignment=1  # Center alignment
+    )
+    
+    input_table = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+    
+    results_table = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.darkgreen),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.lightgreen),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),  # Bold last row
+        ('FONTSIZE', (0, -1), (-1, -1), 11)
+    ])
+    
+    # Farm report: input rows, then a results header at row 7 and its rows
+    section_table = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('BACKGROUND', (0, 7), (-1, 7), colors.darkgreen),
+        ('TEXTCOLOR', (0, 7), (-1, 7), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 7), (-1, 7), 'Helvetica-Bold'),
+        ('BACKGROUND', (0, 1), (-1, 6), colors.beige),
+        ('BACKGROUND', (0, 8), (-1, -1), colors.lightgreen),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold')
+    ])
+    
+    summary_table = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.darkgreen),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.lightgreen),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+    
+    sectors_table = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.darkgreen),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.lightgreen),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+    
+    return {
+        'styles': styles,
+        'title': title_style,
+        'input_table': input_table,
+        'results_table': results_table,
+        'section_table': section_table,
+        'summary_table': summary_table,
+        'sectors_table': sectors_table
+    }
+
+def _input_rows(data):
+    """Rows of the input data table for one calculation"""
+    return [
+        ['Número de invernadero', data.get('numero_invernadero', 'No especificado')],
+        ['Superficie del invernadero', f"{data['superficie']:.2f} m²"],
+        ['Goteros totales', str(data['goteros_totales'])],
+        ['Caudal de cada gotero', f"{data['caudal_gotero']:.2f} L×H⁻¹"],
+        ['CE del abono', str(data['ce_abono'])],
+        ['Tiempo de riego', f"{data['tiempo_riego']:.1f} minutos"]
+    ]
+
+def _result_rows(data):
+    """Rows of the results table for one calculation"""
+    return [
+        ['Goteros por metro cuadrado', f"{data['goteros_por_metro']:.4f}"],
+        ['Litros de agua por hora', f"{data['litros_agua_hora']:.2f} L"],
+        ['Caudal cada 1000 m² por hora', f"{data['caudal_1000m2_hora']:.2f} L"],
+        ['Cantidad de agua gastada en este riego', f"{data.get('agua_gastada_riego', 0):.2f} L"],
+        ['Abono gastado en el riego', f"{data['abono_gastado']:.2f} Kg"]
+    ]
+
+def _sector_flowables(sectores, pdf_styles):
+    """Table of the sectors of a greenhouse (see sectors.iter_greenhouse_reports())"""
+    styles = pdf_styles['styles']
+    header = ['Sector', 'Superficie (m²)', 'Goteros', 'Caudal (L×H⁻¹)', 'CE', 'Tiempo (min)', 'Agua (L)', 'Abono (Kg)']
+    rows = [
+        [
+            str(sector['sector']),
+            f"{sector['superficie']:.2f}",
+            f"{sector['goteros_totales']:.0f}",
+            f"{sector['caudal_gotero']:.2f}",
+            f"{sector['ce_abono']:.2f}",
+            f"{sector['tiempo_riego']:.1f}",
+            f"{sector['agua_gastada_riego']:.2f}",
+            f"{sector['abono_gastado']:.2f}"
+        ]
+        for sector in sectores
+    ]
+    table = Table([header] + rows, colWidths=[0.6*inch] + [0.85*inch] * 7, repeatRows=1)
+    table.setStyle(pdf_styles['sectors_table'])
+    return [
+        Paragraph("<b>Sectores de riego:</b>", styles['Heading2']),
+        Paragraph(
+            "Con varios sectores, el caudal, la CE y el tiempo de riego de los datos de entrada "
+            "son los equivalentes del invernadero completo.",
+            styles['Normal']
+        ),
+        Spacer(1, 8),
+        table
+    ]
+
+def _tank_flowables(tanques, pdf_styles):
+    """Table of the stock tanks of a recipe (see recipes.recipe_for_event())"""
+    styles = pdf_styles['styles']
+    header = ['Tanque', 'Abono (Kg)', 'Solución madre (L)', 'Inyección (L/h)', 'Proporción']
+    rows = [
+        [
+            str(tanque['tanque']),
+            f"{tanque['kg']:.2f}",
+            f"{tanque['litros']:.2f}",
+            f"{tanque['caudal_inyeccion']:.2f}",
+            f"1:{tanque['proporcion']:.0f}" if tanque['proporcion'] else '-'
+        ]
+        for tanque in tanques
+    ]
+    table = Table([header] + rows, colWidths=[1.3*inch, 1.2*inch, 1.4*inch, 1.2*inch, 1.1*inch], repeatRows=1)
+    table.setStyle(pdf_styles['sectors_table'])
+    return [Paragraph("<b>Receta de abonado:</b>", styles['Heading2']), table]
+
+def generate_pdf_report(data):
+    """Generate PDF report with calculation results.
+
+    If data has 'sectores' (see sectors.iter_greenhouse_reports()), a table
+    with the results of every irrigation sector follows the totals, and if
+    it has 'tanques' (see recipes.recipe_for_event()), one with the
+    injection of every stock tank.
+    """
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=1*inch)
+    
+    # Get styles
+    pdf_styles = _pdf_styles()
+    styles = pdf_styles['styles']
+    
+    story = []
+    
+    # Title
+    story.append(Paragraph("Calculadora de Abono para Invernaderos", pdf_styles['title']))
+    story.append(Spacer(1, 20))
+    
+    # Date
+    fecha = data.get('fecha') or datetime.now().strftime("%d/%m/%Y %H:%M")
+    story.append(Paragraph(f"<b>Fecha del cálculo:</b> {escape(str(fecha))}", styles['Normal']))
+    story.append(Spacer(1, 20))
+    
+    # Input data table
+    input_data = [['Parámetro', 'Valor']] + _input_rows(data)
+    
+    input_table = Table(input_data, colWidths=[3*inch, 2*inch])
+    input_table.setStyle(pdf_styles['input_table'])
+    
+    story.append(Paragraph("<b>Datos de Entrada:</b>", styles['Heading2']))
+    story.append(input_table)
+    story.append(Spacer(1, 20))
+    
+    # Results table
+    results_data = [['Resultado', 'Valor']] + _result_rows(data)
+    
+    results_table = Table(results_data, colWidths=[3*inch, 2*inch])
+    results_table.setStyle(pdf_styles['results_table'])
+    
+    story.append(Paragraph("<b>Resultados:</b>", styles['Heading2']))
+    story.append(results_table)
+    
+    if data.get('sectores'):
+        story.append(Spacer(1, 20))
+        story.extend(_sector_flowables(data['sectores'], pdf_styles))
+    
+    if data.get('tanques'):
+        story.append(Spacer(1, 20))
+        story.extend(_tank_flowables(data['tanques'], pdf_styles))
+    
+    doc.build(story)
+    buffer.seek(0)
+    return buffer.getvalue()
+
+class _StreamedStory:
+    """List-like view over a flowable iterator for BaseDocTemplate.build().
+
+    build() only works on the front of its story (peeking, deleting and
+    re-inserting split flowables), so flowables are pulled from the iterator
+    on demand and dropped once drawn. Only a small look-ahead window of
+    flowables is kept, which is enough for keepWithNext groups such as a
+    heading followed by its table. The canvas still keeps every drawn page
+    until the document is saved, so memory grows with the number of pages,
+    at about half the rate of building the whole story as a list.
+    """
+    LOOKAHEAD = 8
+
+    def __init__(self, flowables):
+        self._source = iter(flowables)
+        self._buffer = []
+
+    def _fill(self, size):
+        while len(self._buffer) < size:
+            try:
+                self._buffer.append(next(self._source))
+            except StopIteration:
+                break
+
+    def __len__(self):
+        self._fill(self.LOOKAHEAD)
+        return len(self._buffer)
+
+    def __getitem__(self, index):
+        if isinstance(index, int) and index >= 0:
+            self._fill(index + 1)
+        return self._buffer[index]
+
+    def __setitem__(self, index, value):
+        self._buffer[index] = value
+
+    def __delitem__(self, index):
+        del self._buffer[index]
+
+    def insert(self, index, value):
+        self._buffer.insert(index, value)
+
+SUMMARY_ROWS_PER_TABLE = 40
+
+def _farm_report_story(records, fecha, pdf_styles):
+    """Generate the flowables of a farm report while consuming records"""
+    styles = pdf_styles['styles']
+    yield Paragraph("Calculadora de Abono para Invernaderos", pdf_styles['title'])
+    yield Paragraph("Informe consolidado de la explotación", styles['Heading2'])
+    yield Spacer(1, 10)
+    yield Paragraph(f"<b>Fecha del informe:</b> {escape(str(fecha))}", styles['Normal'])
+    yield Spacer(1, 20)
+
+
+    # Per-greenhouse totals: [riegos, agua, abono], keyed by greenhouse
+    resumen = {}
+    for numero, data in enumerate(records, 1):
+        invernadero = data.get('numero_invernadero') or 'No especificado'
+        # Paragraphs parse markup, and ids and dates come from user files
+        titulo = f"Invernadero {escape(str(invernadero))}"
+        if data.get('fecha'):
+            titulo += f" — {escape(str(data['fecha']))}"
+        heading = Paragraph(f"<b>{numero}. {titulo}</b>", styles['Heading3'])
+        heading.keepWithNext = 1
+        yield heading
+
+        section_data = (
+            [['Parámetro', 'Valor']] + _input_rows(data)
+            + [['Resultado', 'Valor']] + _result_rows(data)
+        )
+        table = Table(section_data, colWidths=[3*inch, 2*inch])
+        table.setStyle(pdf_styles['section_table'])
+        yield table
+        if data.get('sectores'):
+            yield from _sector_flowables(data['sectores'], pdf_styles)
+        if data.get('tanques'):
+            yield from _tank_flowables(data['tanques'], pdf_styles)
+        yield Spacer(1, 12)
+
+        totales = resumen.setdefault(invernadero, [0, 0.0, 0.0])
+        totales[0] += 1
+        totales[1] += data.get('agua_gastada_riego', 0)
+        totales[2] += data['abono_gastado']
+
+    # The summary needs every record, so it closes the report
+    yield Paragraph("<b>Resumen por invernadero:</b>", styles['Heading2'])
+
+    header = ['Invernadero', 'Riegos', 'Agua (L)', 'Abono (Kg)']
+    widths = [2*inch, 1*inch, 1.5*inch, 1.5*inch]
+
+    # Small tables instead of one long one, so splitting across pages stays cheap
+    rows = [
+        [str(invernadero), str(riegos), f"{agua:.2f}", f"{abono:.2f}"]
+        for invernadero, (riegos, agua, abono) in resumen.items()
+    ]
+    for start in range(0, len(rows), SUMMARY_ROWS_PER_TABLE):
+        table = Table([header] + rows[start:start + SUMMARY_ROWS_PER_TABLE], colWidths=widths)
+        table.setStyle(pdf_styles['summary_table'])
+        yield table
+    del rows
+
+    total_riegos = sum(totales[0] for totales in resumen.values())
+    total_agua = sum(totales[1] for totales in resumen.values())
+    total_abono = sum(totales[2] for totales in resumen.values())
+    totals_table = Table(
+        [
+            ['Totales de la explotación', 'Valor'],
+            ['Invernaderos', str(len(resumen))],
+            ['Riegos', str(total_riegos)],
+            ['Agua gastada', f"{total_agua:.2f} L"],
+            ['Abono gastado', f"{total_abono:.2f} Kg"]
+        ],
+        colWidths=[3*inch, 2*inch]
+    )
+    totals_table.setStyle(pdf_styles['results_table'])
+    yield Spacer(1, 20)
+    yield totals_table
+
+def generate_farm_report(records, output=None, fecha=None):
+    """Generate a single PDF report for many calculations.
+
+    records can be any iterable of calculation dicts (the same shape as for
+    generate_pdf_report), including a generator reading a large file: it is
+    consumed once and each greenhouse section is laid out and discarded as
+    soon as it is drawn (the drawn pages themselves stay in memory until the
+    PDF is written; see _StreamedStory). The report ends with a summary table per greenhouse
+    and the totals of water and fertilizer.
+
+    Writes to output (a path or binary file object) when given, otherwise
+    returns the PDF bytes.
+    """
+    buffer = io.BytesIO() if output is None else output
+    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=1*inch)
+
+    pdf_styles = _pdf_styles()
+    fecha = fecha or datetime.now().strftime("%d/%m/%Y %H:%M")
+
+    doc.build(_StreamedStory(_farm_report_story(records, fecha, pdf_styles)))
+    if output is None:
+        return buffer.getvalue()
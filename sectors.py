@@ -0,0 +1,113 @@
+"""Greenhouses with several irrigation sectors.
+
+A sector has its own area, emitters, emitter flow, CE and irrigation time,
+so a greenhouse with mixed emitter types is described by one row per sector
+with the same numero_invernadero (the columns of EVENT_FIELDS, so event
+files can be read with batch.read_event_chunks()).
+
+Every sector of every greenhouse is computed in a single calculate_batch()
+pass and summed per greenhouse with np.bincount(). The greenhouse totals are
+returned with equivalent inputs (mean emitter flow, equivalent time and CE)
+chosen so that calculate() on them gives back the same totals, which lets
+them go through every path that takes a single calculation.
+"""
+import numpy as np
+
+from calculations import INPUT_FIELDS, OUTPUT_FIELDS, calculate_batch
+
+# Per-sector values shown in the reports
+SECTOR_FIELDS = INPUT_FIELDS + ('agua_gastada_riego', 'abono_gastado')
+
+def _divide(numerador, denominador):
+    resultado = np.zeros(np.shape(numerador))
+    np.divide(numerador, denominador, out=resultado, where=denominador > 0)
+    return resultado
+
+def calculate_sectors(numero_invernadero, superficie, goteros_totales, caudal_gotero, ce_abono, tiempo_riego):
+    """Per-sector and per-greenhouse results of one irrigation of every sector.
+
+    numero_invernadero is a sequence with the greenhouse of each sector; the
+    other arguments are arrays with one value per sector, or scalars.
+    Returns a dict with:
+
+    - 'sectores': the input columns plus the calculate_batch() results of
+      every sector, and 'invernadero', the row of its greenhouse.
+    - 'invernaderos': one row per greenhouse, in order of first appearance,
+      with the OUTPUT_FIELDS columns (the chunk layout of batch.py) and
+      'sectores', the number of sectors. Invalid sectors (see
+      calculate_batch()) count towards 'sectores' but not the totals.
+    """
+    numeros = [str(numero) for numero in numero_invernadero]
+    filas = {}
+    invernadero = np.fromiter((filas.setdefault(numero, len(filas)) for numero in numeros), dtype=np.intp, count=len(numeros))
+    entradas = np.broadcast_arrays(
+        *(np.asarray(v, dtype=np.float64) for v in (superficie, goteros_totales, caudal_gotero, ce_abono, tiempo_riego)),
+        invernadero
+    )[:-1]
+    por_sector = calculate_batch(*entradas)
+    valido = por_sector['valido']
+
+    def suma(valores):
+        return np.bincount(invernadero, weights=np.where(valido, valores, 0.0), minlength=len(filas))
+
+    superficie_total = suma(entradas[0])
+    goteros = suma(entradas[1])
+    litros_agua_hora = suma(por_sector['litros_agua_hora'])
+    agua_gastada_riego = suma(por_sector['agua_gastada_riego'])
+    abono_gastado = suma(por_sector['abono_gastado'])
+
+    caudal_1000m2_hora = _divide(litros_agua_hora, superficie_total / 1000)
+    tiempo_equivalente = _divide(agua_gastada_riego, litros_agua_hora / 60)
+    invernaderos = {
+        'numero_invernadero': list(filas),
+        'superficie': superficie_total,
+        'goteros_totales': goteros,
+        'caudal_gotero': _divide(litros_agua_hora, goteros),
+        'ce_abono': _divide(abono_gastado, (caudal_1000m2_hora / 100000) * tiempo_equivalente * (superficie_total / 1000)),
+        'tiempo_riego': tiempo_equivalente,
+        'goteros_por_metro': _divide(goteros, superficie_total),
+        'litros_agua_hora': litros_agua_hora,
+        'caudal_1000m2_hora': caudal_1000m2_hora,
+        'agua_gastada_riego': agua_gastada_riego,
+        'abono_gastado': abono_gastado,
+        'sectores': np.bincount(invernadero, minlength=len(filas))
+    }
+
+    sectores = {'numero_invernadero': numeros, 'invernadero': invernadero}
+    sectores.update(zip(INPUT_FIELDS, entradas))
+    sectores.update(por_sector)
+    return {'sectores': sectores, 'invernaderos': invernaderos}
+
+def calculate_sector_chunks(chunks):
+    """calculate_sectors() over event chunks (see batch.read_event_chunks()), one row per sector"""
+    chunks = list(chunks)
+    columnas = {'numero_invernadero': [numero for chunk in chunks for numero in chunk['numero_invernadero']]}
+    for campo in INPUT_FIELDS:
+        columnas[campo] = np.concatenate([chunk[campo] for chunk in chunks]) if chunks else np.empty(0)
+    return calculate_sectors(*(columnas[campo] for campo in ('numero_invernadero',) + INPUT_FIELDS))
+
+def iter_greenhouse_reports(resultado):
+    """Yield a report dict per greenhouse of a calculate_sectors() result.
+
+    Each has the greenhouse totals under the OUTPUT_FIELDS keys, as taken by
+    generate_pdf_report(), plus 'sectores': a list of dicts with the
+    SECTOR_FIELDS of each of its sectors, numbered from 1 under 'sector'.
+    """
+    sectores = resultado['sectores']
+    invernaderos = resultado['invernaderos']
+    filas_sector = [[] for _ in invernaderos['numero_invernadero']]
+    for fila, invernadero in enumerate(sectores['invernadero'].tolist()):
+        filas_sector[invernadero].append(fila)
+
+    valores_sector = {campo: sectores[campo].tolist() for campo in SECTOR_FIELDS}
+    valores = {campo: invernaderos[campo].tolist() for campo in OUTPUT_FIELDS[1:]}
+    for i, numero in enumerate(invernaderos['numero_invernadero']):
+        data = {'numero_invernadero': numero}
+        data.update((campo, valores[campo][i]) for campo in OUTPUT_FIELDS[1:])
+        if data['goteros_totales'].is_integer():
+            data['goteros_totales'] = int(data['goteros_totales'])
+        data['sectores'] = [
+            {'sector': n, **{campo: valores_sector[campo][fila] for campo in SECTOR_FIELDS}}
+            for n, fila in enumerate(filas_sector[i], 1)
+        ]
+        yield data
@@ -0,0 +1,175 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import quote
+
+from metrics import timed
+
+EMAIL_SUBJECT = "Resultados Calculadora de Abono"
+
+SHARE_WORKERS = int(os.environ.get('ABONO_SHARE_WORKERS', '4'))
+
+# Events listed one by one in a batch share text; the rest only count in the totals
+MAX_SHARE_LINES = 20
+
+SHARE_FOOTER = "Calculado con: https://calculadora-abono-invernaderos.replit.app"
+
+def generate_share_text(data):
+    """Generate comprehensive text with all data and results for sharing"""
+    fecha = data.get('fecha') or datetime.now().strftime("%d/%m/%Y %H:%M")
+    
+    share_text = f"""🌱 CALCULADORA DE ABONO PARA INVERNADEROS
+Fecha del cálculo: {fecha}
+
+📊 DATOS DE ENTRADA:
+• Número de invernadero: {data.get('numero_invernadero', 'No especificado')}
+• Superficie del invernadero: {data['superficie']:.2f} m²
+• Goteros totales: {data['goteros_totales']}
+• Caudal de cada gotero: {data['caudal_gotero']:.2f} L×H⁻¹
+• CE del abono: {data['ce_abono']}
+• Tiempo de riego: {data['tiempo_riego']:.1f} minutos
+
+📈 RESULTADOS CALCULADOS:
+• Goteros por metro cuadrado: {data['goteros_por_metro']:.4f}
+• Litros de agua por hora: {data['litros_agua_hora']:.2f} L
+• Caudal cada 1000 m² por hora: {data['caudal_1000m2_hora']:.2f} L
+• Cantidad de agua gastada en este riego: {data.get('agua_gastada_riego', 0):.2f} L
+
+🎯 RESULTADO FINAL:
+• Abono gastado en el riego: {data['abono_gastado']:.2f} Kg
+{_sector_lines(data.get('sectores'))}{_tank_lines(data.get('tanques'))}
+{SHARE_FOOTER}"""
+    
+    return share_text
+
+def _sector_lines(sectores):
+    """Share text lines of the sectors of a greenhouse (see sectors.iter_greenhouse_reports()), if any"""
+    if not sectores:
+        return ''
+    lineas = ['', '🧩 SECTORES DE RIEGO:']
+    for sector in sectores:
+        lineas.append(
+            f"• Sector {sector['sector']}: {sector['tiempo_riego']:.1f} min, CE {sector['ce_abono']:.2f}"
+            f" → {sector['agua_gastada_riego']:.2f} L, {sector['abono_gastado']:.2f} Kg"
+        )
+    return '\n'.join(lineas) + '\n'
+
+def _tank_lines(tanques):
+    """Share text lines of a recipe (see recipes.recipe_for_event()), if any"""
+    if not tanques:
+        return ''
+    lineas = ['', '🧪 TANQUES DE ABONADO:']
+    for tanque in tanques:
+        proporcion = f" (1:{tanque['proporcion']:.0f})" if tanque['proporcion'] else ''
+        lineas.append(f"• {tanque['tanque']}: {tanque['kg']:.2f} Kg — {tanque['litros']:.2f} L de solución madre{proporcion}")
+    return '\n'.join(lineas) + '\n'
+
+def build_share_links(share_text):
+    """Email, WhatsApp and Telegram links carrying the share text, URL-encoded"""
+    texto = quote(share_text, safe='')
+    # Mail clients expect CRLF line breaks in the body
+    cuerpo = quote(share_text.replace('\n', '\r\n'), safe='')
+    return {
+        'email': f"mailto:?subject={quote(EMAIL_SUBJECT, safe='')}&body={cuerpo}",
+        'whatsapp': f"https://wa.me/?text={texto}",
+        'telegram': f"https://t.me/share/url?text={texto}"
+    }
+
+class BatchShareSummary:
+    """Totals and first lines of many results, for a batch share text.
+
+    Fed with computed chunks (see batch.compute_chunks()), so a file of any
+    size is summarized in one pass with vectorized totals; only the first
+    max_lines events are kept for the detail lines.
+    """
+
+    def __init__(self, max_lines=MAX_SHARE_LINES):
+        self.max_lines = max_lines
+        self.riegos = 0
+        self.agua = 0.0
+        self.abono = 0.0
+        self.invernaderos = set()
+        self.lineas = []
+
+    def add_chunk(self, chunk):
+        numeros = chunk['numero_invernadero']
+        self.riegos += len(numeros)
+        self.agua += float(chunk['agua_gastada_riego'].sum())
+        self.abono += float(chunk['abono_gastado'].sum())
+        self.invernaderos.update(numeros)
+        for i in range(min(len(numeros), self.max_lines - len(self.lineas))):
+            self.lineas.append(
+                f"• Inv. {numeros[i] or '-'}: {chunk['tiempo_riego'][i]:.1f} min, CE {chunk['ce_abono'][i]:.2f}"
+                f" → {chunk['agua_gastada_riego'][i]:.2f} L, {chunk['abono_gastado'][i]:.2f} Kg"
+            )
+
+    def observe(self, chunks):
+        """Pass chunks through unchanged while adding them to the summary"""
+        for chunk in chunks:
+            self.add_chunk(chunk)
+            yield chunk
+
+    def text(self, fecha=None):
+        fecha = fecha or datetime.now().strftime("%d/%m/%Y %H:%M")
+        lineas = [
+            "🌱 CALCULADORA DE ABONO PARA INVERNADEROS",
+            f"Fecha del cálculo: {fecha}",
+            "",
+            f"📊 RESUMEN DE {self.riegos} RIEGOS:",
+            f"• Invernaderos: {len(self.invernaderos)}",
+            f"• Agua gastada: {self.agua:.2f} L",
+            f"• Abono gastado: {self.abono:.2f} Kg"
+        ]
+        if self.lineas:
+            lineas += ["", "📋 DETALLE:"] + self.lineas
+            if self.riegos > len(self.lineas):
+                lineas.append(f"… y {self.riegos - len(self.lineas)} riegos más")
+        lineas += ["", SHARE_FOOTER]
+        return '\n'.join(lineas)
+
+def generate_batch_share_text(chunks, fecha=None):
+    """Share text summarizing many results given as computed chunks"""
+    resumen = BatchShareSummary()
+    for chunk in chunks:
+        resumen.add_chunk(chunk)
+    return resumen.text(fecha)
+
+def build_share_package(data):
+    """Share text and links of one calculation.
+
+    Takes microseconds, so it runs in the request; the PDF is left to
+    submit_share_pdf() for when someone asks for it.
+    """
+    with timed('share_links'):
+        share_text = generate_share_text(data)
+        links = build_share_links(share_text)
+    return {
+        'text': share_text,
+        'links': links
+    }
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_share_executor():
+    """Thread pool shared by all sessions, sized with ABONO_SHARE_WORKERS.
+
+    Threads rather than processes, so renders share the process-wide PDF
+    cache and simultaneous shares of the same report render it only once.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=SHARE_WORKERS, thread_name_prefix='share')
+        return _executor
+
+def _share_pdf(data):
+    from pdf_cache import cached_pdf_report
+
+    with timed('share_pdf'):
+        return cached_pdf_report(data)
+
+def submit_share_pdf(data):
+    """Render the PDF to attach to a share in the background and return its Future"""
+    return get_share_executor().submit(_share_pdf, dict(data))
@@ -0,0 +1,70 @@
+import numpy as np
+
+from calculations import calculate_batch
+
+def build_schedule(fases):
+    """Expand crop phases into daily schedule arrays.
+
+    fases is a sequence of (dias, riegos_por_dia, tiempo_riego, ce_abono)
+    tuples, one per phase of the season in order. Returns a dict with a
+    1-D array per schedule field, one entry per day of the season.
+    """
+    fases = np.asarray(fases, dtype=np.float64).reshape(-1, 4)
+    dias = fases[:, 0].astype(np.int64)
+    if (dias < 0).any():
+        raise ValueError("La duración de las fases no puede ser negativa")
+    return {
+        'riegos_por_dia': np.repeat(fases[:, 1], dias),
+        'tiempo_riego': np.repeat(fases[:, 2], dias),
+        'ce_abono': np.repeat(fases[:, 3], dias)
+    }
+
+def simulate_season(superficie, goteros_totales, caudal_gotero, riegos_por_dia, tiempo_riego, ce_abono):
+    """Daily and cumulative water and fertilizer over a season.
+
+    The greenhouse values (superficie, goteros_totales, caudal_gotero) are
+    arrays of shape (G,) for G greenhouses, or scalars. The schedule values
+    are indexed by day first: shape (D,) for a plan shared by every
+    greenhouse, or (D, G) for one plan per greenhouse. Scalars are allowed
+    anywhere. Everything is evaluated in a single broadcast over the
+    (D, G) grid using the same rules as calculate_batch().
+
+    Returns a dict of (D, G) arrays 'agua_diaria', 'abono_diario',
+    'agua_acumulada' and 'abono_acumulado', plus the farm-wide curves
+    'agua_total_acumulada' and 'abono_total_acumulado' of shape (D,).
+    """
+    superficie = np.atleast_1d(np.asarray(superficie, dtype=np.float64))
+    goteros_totales = np.atleast_1d(np.asarray(goteros_totales, dtype=np.float64))
+    caudal_gotero = np.atleast_1d(np.asarray(caudal_gotero, dtype=np.float64))
+
+    def por_dia(valores):
+        valores = np.asarray(valores, dtype=np.float64)
+        # A 1-D plan is per day, shared by every greenhouse
+        return valores[:, np.newaxis] if valores.ndim == 1 else valores
+
+    riegos_por_dia = por_dia(riegos_por_dia)
+    # NaN or negative irrigation counts mean no irrigation that day
+    riegos_por_dia = np.where(riegos_por_dia > 0, riegos_por_dia, 0.0)
+
+    por_riego = calculate_batch(
+        superficie[np.newaxis, :],
+        goteros_totales[np.newaxis, :],
+        caudal_gotero[np.newaxis, :],
+        por_dia(ce_abono),
+        por_dia(tiempo_riego)
+    )
+    shape = np.broadcast_shapes(por_riego['agua_gastada_riego'].shape, riegos_por_dia.shape)
+
+    agua_diaria = np.broadcast_to(por_riego['agua_gastada_riego'] * riegos_por_dia, shape)
+    abono_diario = np.broadcast_to(por_riego['abono_gastado'] * riegos_por_dia, shape)
+    agua_acumulada = np.cumsum(agua_diaria, axis=0)
+    abono_acumulado = np.cumsum(abono_diario, axis=0)
+
+    return {
+        'agua_diaria': agua_diaria,
+        'abono_diario': abono_diario,
+        'agua_acumulada': agua_acumulada,
+        'abono_acumulado': abono_acumulado,
+        'agua_total_acumulada': agua_acumulada.sum(axis=1),
+        'abono_total_acumulado': abono_acumulado.sum(axis=1)
+    }
@@ -0,0 +1,50 @@
+"""Closed-form inverses of the fertilizer formulas.
+
+The forward formulas are linear in tiempo_riego and ce_abono:
+
+    agua_gastada_riego = litros_agua_hora / 60 * tiempo_riego
+    abono_gastado = (caudal_1000m2_hora / 100000) * ce_abono * tiempo_riego * (superficie / 1000)
+
+so the required time or CE for a target is a single division. Every function
+broadcasts its arguments like calculate_batch() and returns NaN where there
+is no solution (invalid greenhouse values, a non-positive target or a
+non-positive fixed CE/time).
+"""
+import numpy as np
+
+from calculations import calculate_batch
+
+def _emitter_values(superficie, goteros_totales, caudal_gotero):
+    """Time- and CE-independent results, with the validity mask"""
+    return calculate_batch(superficie, goteros_totales, caudal_gotero, 0, 0)
+
+def _solve(numerador, denominador, valido):
+    numerador, denominador, valido = np.broadcast_arrays(numerador, denominador, valido)
+    resultado = np.full(numerador.shape, np.nan)
+    valido = valido & (numerador > 0) & (denominador > 0)
+    np.divide(numerador, denominador, out=resultado, where=valido)
+    return resultado
+
+def required_time_for_water(superficie, goteros_totales, caudal_gotero, agua_objetivo):
+    """Irrigation minutes needed to use agua_objetivo liters of water"""
+    base = _emitter_values(superficie, goteros_totales, caudal_gotero)
+    agua_objetivo = np.asarray(agua_objetivo, dtype=np.float64)
+    return _solve(agua_objetivo, base['litros_agua_hora'] / 60, base['valido'])
+
+def required_time_for_fertilizer(superficie, goteros_totales, caudal_gotero, ce_abono, abono_objetivo):
+    """Irrigation minutes needed to use abono_objetivo kg of fertilizer at ce_abono"""
+    base = _emitter_values(superficie, goteros_totales, caudal_gotero)
+    superficie = np.asarray(superficie, dtype=np.float64)
+    ce_abono = np.asarray(ce_abono, dtype=np.float64)
+    abono_objetivo = np.asarray(abono_objetivo, dtype=np.float64)
+    kg_por_minuto = (base['caudal_1000m2_hora'] / 100000) * ce_abono * (superficie / 1000)
+    return _solve(abono_objetivo, kg_por_minuto, base['valido'])
+
+def required_ce_for_fertilizer(superficie, goteros_totales, caudal_gotero, tiempo_riego, abono_objetivo):
+    """CE needed to use abono_objetivo kg of fertilizer in tiempo_riego minutes"""
+    base = _emitter_values(superficie, goteros_totales, caudal_gotero)
+    superficie = np.asarray(superficie, dtype=np.float64)
+    tiempo_riego = np.asarray(tiempo_riego, dtype=np.float64)
+    abono_objetivo = np.asarray(abono_objetivo, dtype=np.float64)
+    kg_por_ce = (base['caudal_1000m2_hora'] / 100000) * tiempo_riego * (superficie / 1000)
+    return _solve(abono_objetivo, kg_por_ce, base['valido'])
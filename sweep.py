@@ -0,0 +1,38 @@
+from functools import lru_cache
+
+import numpy as np
+
+from calculations import INPUT_FIELDS, calculate_batch
+
+@lru_cache(maxsize=64)
+def sweep_grid(base, eje_x, rango_x, eje_y, rango_y):
+    """Evaluate water and fertilizer over a grid of two inputs.
+
+    base is a tuple of (campo, valor) pairs with the fixed value of every
+    field in INPUT_FIELDS; eje_x and eje_y name the two swept fields and
+    rango_x / rango_y are (inicio, fin, puntos) tuples. The whole grid is
+    evaluated in one broadcast of calculate_batch().
+
+    Results are cached by their arguments (which is why they are tuples),
+    so redrawing, zooming or panning a chart reuses the same grid. The
+    returned arrays are read-only since they are shared between callers:
+    'x' (X,), 'y' (Y,), and 'agua_gastada_riego' and 'abono_gastado' (Y, X).
+    """
+    if eje_x == eje_y:
+        raise ValueError("Los dos ejes deben ser parámetros distintos")
+    entradas = dict(base)
+    x = np.linspace(*rango_x[:2], int(rango_x[2]))
+    y = np.linspace(*rango_y[:2], int(rango_y[2]))
+    entradas[eje_x] = x[np.newaxis, :]
+    entradas[eje_y] = y[:, np.newaxis]
+
+    resultados = calculate_batch(*(entradas[campo] for campo in INPUT_FIELDS))
+    grid = {
+        'x': x,
+        'y': y,
+        'agua_gastada_riego': resultados['agua_gastada_riego'],
+        'abono_gastado': resultados['abono_gastado']
+    }
+    for valores in grid.values():
+        valores.flags.writeable = False
+    return grid
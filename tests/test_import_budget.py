@@ -0,0 +1,17 @@
+"""Cold-start budget of app.py, as enforced by bench.py's import_app benchmark."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import IMPORT_BUDGET_SECONDS, LAZY_MODULES, _import_time
+
+def test_app_import_is_within_budget():
+    # The first import also compiles the bytecode; time the warm ones
+    _import_time('app')
+    segundos = min(_import_time('app')[0] for _ in range(3))
+    assert segundos < IMPORT_BUDGET_SECONDS, f"importar app.py tarda {segundos:.3f} s"
+
+def test_app_import_loads_no_lazy_module():
+    _, cargados = _import_time('app')
+    assert not set(cargados) & set(LAZY_MODULES), f"app.py carga al importarse: {', '.join(cargados)}"
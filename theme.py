@@ -0,0 +1,41 @@
+import os
+from functools import lru_cache
+
+import streamlit as st
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+CSS_FILE = 'styles.css'
+
+@lru_cache(maxsize=None)
+def load_css():
+    """Stylesheet of the app, read once per process and shared by all sessions"""
+    with open(os.path.join(STATIC_DIR, CSS_FILE), encoding='utf-8') as f:
+        return f.read()
+
+@lru_cache(maxsize=None)
+def _css_markup(static_serving):
+    """Markup injected on every rerun for the chosen CSS delivery mode"""
+    if static_serving:
+        # Only a short reference is sent; the browser fetches and caches the file
+        return f'<style>@import url("app/static/{CSS_FILE}");</style>'
+    return f'<style>\n{load_css()}</style>'
+
+@lru_cache(maxsize=256)
+def metric_card_html(titulo, valor, formula):
+    """Markup of a result card, memoized per process since values repeat across reruns and sessions"""
+    return f'''
+    <div class="metric-card">
+        <h4 style="color: #1a202c; margin: 0; font-weight: 600;">{titulo}</h4>
+        <p style="font-size: 1.4rem; font-weight: 700; margin: 0.75rem 0; color: #16a34a;">{valor}</p>
+        <small style="color: #64748b; font-weight: 500;">{formula}</small>
+    </div>
+    '''
+
+def inject_css():
+    """Inject the app stylesheet.
+
+    With Streamlit's static file serving enabled (server.enableStaticServing)
+    the stylesheet is served from static/ instead of being inlined in every
+    rerun.
+    """
+    st.markdown(_css_markup(bool(st.get_option('server.enableStaticServing'))), unsafe_allow_html=True)